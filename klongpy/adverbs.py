@@ -1,5 +1,7 @@
 from .core import *
-from .dyads import eval_dyad_add, eval_dyad_subtract, eval_dyad_multiply, eval_dyad_divide
+from .dyads import (eval_dyad_add, eval_dyad_divide, eval_dyad_equal, eval_dyad_less, eval_dyad_maximum,
+                    eval_dyad_minimum, eval_dyad_more, eval_dyad_multiply, eval_dyad_power, eval_dyad_remainder,
+                    eval_dyad_subtract)
 import functools
 import itertools
 
@@ -28,6 +30,315 @@ def get_adverb_fn(klong, s, arity):
     raise RuntimeError(f"unknown adverb: {s}")
 
 
+def get_adverb_chain_fn(klong, arr):
+    """
+    Build the function for the verb and adverbs of an adverb chain (see chain_adverbs).
+
+    The returned function expects the already evaluated argument(s) of the chain.
+    Operator verbs are bound to their monad/dyad function up front.
+    """
+    if isinstance(arr[0].a, KGOp) and arr[0].a.a != '::':
+        f = klong._get_op_fn(arr[0].a.a, arr[0].arity)
+    elif arr[0].arity == 1:
+        f = lambda x,k=klong,a=arr[0].a: k.eval(KGCall(a, [x], arity=1))
+    else:
+        f = lambda x,y,k=klong,a=arr[0].a: k.eval(KGCall(a, [x,y], arity=2))
+    g = f
+    for i in range(1,len(arr)-1):
+        o = get_adverb_fn(klong, arr[i].a, arity=arr[i].arity)
+        if i == 1 and is_elementwise_verb(arr[0].a, arr[0].arity):
+            o = _vectorized_adverbs.get(o, o)
+        elif i == 2 and o is eval_adverb_each and arr[1].a == '/' and arr[1].arity == 1 and g in _each_over_reductions:
+            o = functools.partial(eval_adverb_each_over_reduce, _each_over_reductions[g])
+        if arr[i].arity == 1:
+            f = lambda x,f=f,o=o: o(f,x,op=arr[0].a)
+        else:
+            f = lambda x,y,f=f,o=o: o(f,x,y)
+    return f
+
+
+# atomic operators: applying them to each element of an array is the same as applying them to the array
+elementwise_monads = {'-'}
+elementwise_dyads = {'+', '-', '*', '%', '&', '|', '<', '>', '='}
+
+
+def _elementwise_params(x, params):
+    """
+    Return the number of references to params in x, or None if x is not an elementwise expression.
+    """
+    if isinstance(x, KGSym):
+        return 1 if x in params else None
+    if type(x) in (int, float):
+        return 0
+    if not isinstance(x, KGFn) or not x.is_op():
+        x = getattr(x, 'expr', None) # fused expression (see KGFused)
+        if x is None:
+            return None
+    if x.a.a not in (elementwise_monads if x.a.arity == 1 else elementwise_dyads):
+        return None
+    n = 0
+    for q in ([x.args] if x.a.arity == 1 else x.args):
+        c = _elementwise_params(q, params)
+        if c is None:
+            return None
+        n += c
+    return n
+
+
+def is_elementwise_verb(v, arity):
+    """
+
+    True if the verb v of the given arity is an atomic operator or a function whose
+    body only applies atomic operators to its arguments and to numbers, e.g. {x*x+1}.
+
+    """
+    if isinstance(v, KGOp):
+        return v.a in (elementwise_monads if arity == 1 else elementwise_dyads)
+    if isinstance(v, KGFn) and not isinstance(v, KGCall) and v.args is None and v.arity == arity and not isinstance(v.a, KGSym):
+        return bool(_elementwise_params(v.a, reserved_fn_symbols[:arity]))
+    return False
+
+
+def _is_numeric_array(a):
+    return np.isarray(a) and a.dtype.kind in 'biuf' and a.ndim > 0 and a.size > 0
+
+
+def _is_numeric_atom(a):
+    return type(a) in (int, float) or (isinstance(a, np.number) and a.dtype.kind in 'biuf')
+
+
+def eval_adverb_each_vectorized(f, a, op):
+    """
+    eval_adverb_each for an elementwise verb: a numeric array, or the numbers of a jagged
+    list (see ragged), are passed to f as a whole.
+    """
+    if _is_numeric_array(a):
+        return f(a)
+    r = ragged_fn(a, f)
+    return eval_adverb_each(f, a, op) if r is None else r
+
+
+def eval_adverb_each2_vectorized(f, a, b):
+    """
+    eval_adverb_each2 for an elementwise verb: numeric arrays of the same shape
+    (after dropping the excess elements of the longer one) are passed to f as a whole,
+    as are jagged lists of the same shape (see ragged_fn2).
+    """
+    if _is_numeric_array(a) and _is_numeric_array(b):
+        n = min(len(a), len(b))
+        if a[:n].shape == b[:n].shape:
+            return f(a[:n], b[:n])
+    elif np.isarray(a) and np.isarray(b) and len(a) == len(b):
+        r = ragged_fn2(a, b, f)
+        if r is not None:
+            return r
+    return eval_adverb_each2(f, a, b)
+
+
+def eval_adverb_each_left_vectorized(f, a, b):
+    """
+    eval_adverb_each_left for an elementwise verb: a number and a numeric array (or the numbers
+    of a jagged list) are passed to f as is.
+    """
+    if _is_numeric_atom(a):
+        if _is_numeric_array(b):
+            return f(a, b)
+        r = ragged_fn2(a, b, f)
+        if r is not None:
+            return r
+    return eval_adverb_each_left(f, a, b)
+
+
+def eval_adverb_each_right_vectorized(f, a, b):
+    """
+    see: eval_adverb_each_left_vectorized
+    """
+    if _is_numeric_atom(a):
+        if _is_numeric_array(b):
+            return f(b, a)
+        r = ragged_fn2(b, a, f)
+        if r is not None:
+            return r
+    return eval_adverb_each_right(f, a, b)
+
+
+# Over of these dyads is computed for all elements of a list at once (see eval_adverb_each_over_reduce)
+_each_over_reductions = {
+    eval_dyad_add: 'add',
+    eval_dyad_multiply: 'multiply',
+    eval_dyad_minimum: 'minimum',
+    eval_dyad_maximum: 'maximum',
+}
+
+
+def eval_adverb_each_over_reduce(name, f, a, op):
+    """
+    eval_adverb_each of f/ (Over), where f is the atomic dyad of the ufunc name: the rows of
+    a matrix or the elements of a jagged list (see ragged) are folded in a single call.
+
+    Sums and products of floats are left to Over, since their rounding depends on the order
+    of the additions.
+    """
+    exact = name in ('minimum', 'maximum')
+    if _is_numeric_array(a):
+        a = a if exact else truth_to_int(a)
+        if a.ndim == 2 and a.shape[1] > 0 and (exact or a.dtype.kind in 'iu'):
+            return getattr(np, name).reduce(a, axis=1)
+    else:
+        r = ragged(a)
+        if r is not None and (exact or r[0].dtype.kind in 'iu') and (np.diff(r[1]) > 0).all():
+            return getattr(np, name).reduceat(r[0], r[1][:-1])
+    return eval_adverb_each(f, a, op)
+
+
+def chain_adverbs(klong, arr):
+    """
+
+        Multiple Adverbs
+
+        Multiple adverbs can be attached to a verb. In this case, the
+        first adverb modifies the verb, giving a new verb, and the next
+        adverb modifies the new verb. Note that subsequent adverbs must
+        be adverbs of monadic verbs, because the first verb-adverb
+        combination in a chain of adverbs forms a monad. So ,/' (Join-
+        Over-Each) would work, but ,/:' (Join-Over-Each-Pair) would not,
+        because :' expects a dyadic verb.
+
+        Examples:
+
+        +/' (Plus-Over-Each) would apply Plus-Over to each member of a
+        list:
+
+        +/'[[1 2 3] [4 5 6] [7 8 9]]  -->  [6 15 24]
+
+        ,/:~ (Flatten-Over-Converging) would apply Flatten-Over until a
+        fixpoint is reached:
+
+        ,/:~[1 [2 [3 [4] 5] 6] 7]  -->  [1 2 3 4 5 6 7]
+
+        ,/\~ (Flatten-Over-Scan-Converging) explains why ,/:~ flattens
+        any object:
+
+        ,/\~[1 [2 [3 [4] 5] 6] 7]  -->  [[1 [2 [3 [4] 5] 6] 7]
+                                          [1 2 [3 [4] 5] 6 7]
+                                           [1 2 3 [4] 5 6 7]
+                                            [1 2 3 4 5 6 7]]
+
+    """
+    f = get_adverb_chain_fn(klong, arr)
+    if arr[-2].arity == 1:
+        f = lambda a=arr[-1],f=f,k=klong: f(k.eval(a))
+    else:
+        f = lambda a=arr[-1],f=f,k=klong: f(k.eval(a[0]),k.eval(a[1]))
+    return f
+
+
+# Atomic dyads and the ufuncs used to fold them over numeric arrays (see _ufunc_reduce).
+# Ufuncs are looked up by name at call time so that the backend (NumPy or CuPy) is used.
+# The comparisons have no ufunc: they produce 0/1, which is folded by _truth_states.
+_atomic_dyads = {
+    eval_dyad_add: 'add',
+    eval_dyad_subtract: 'subtract',
+    eval_dyad_multiply: 'multiply',
+    eval_dyad_divide: 'divide',
+    eval_dyad_minimum: 'minimum',
+    eval_dyad_maximum: 'maximum',
+    eval_dyad_remainder: 'fmod',
+    eval_dyad_power: 'power',
+    eval_dyad_less: None,
+    eval_dyad_more: None,
+    eval_dyad_equal: None,
+}
+
+
+def _truth_states(f, r, b):
+    """
+
+    Return the successive results of folding the comparison f over the 1-D array b,
+    starting with the result r (0 or 1) of a previous comparison.
+
+    Since every result is 0 or 1, each element of b maps the previous result to the
+    next by one of: constant 0, constant 1, identity or negation.  A result is thus the
+    last constant before it, or r, flipped once for every negation since.
+
+    """
+    u0 = f(0, b)
+    u1 = f(1, b)
+    const = u0 == u1
+    last = np.maximum.accumulate(np.where(const, np.arange(len(b)), -1))
+    flips = np.cumsum(~const & (u0 == 1))
+    seen = last >= 0
+    last = np.where(seen, last, 0)
+    base = np.where(seen, u0[last], r)
+    n = flips - np.where(seen, flips[last], 0)
+    return base ^ (n & 1)
+
+
+def _ufunc_fold(f, a, accumulate=False, head=None):
+    """
+
+    Fold the atomic dyad f over the numeric array a (of at least two elements) as
+    functools.reduce (or itertools.accumulate) would, but without a Python loop.
+
+    head is the value of the first element if it differs from a[0] in type, which
+    happens when a is the operand of a neutral adverb (see _neutral_operand).
+
+    Returns None if f can't be folded this way.
+
+    """
+    if f not in _atomic_dyads:
+        return None
+    name = _atomic_dyads[f]
+    if name not in (None, 'minimum', 'maximum'):
+        a = truth_to_int(a)
+    head = a[0] if head is None else head
+    if name is None:
+        if a.ndim != 1:
+            return None
+        r = f(head, a[1])
+        q = _truth_states(f, r, a[2:])
+        if not accumulate:
+            return q[-1] if len(q) > 0 else r
+        return np.concatenate([np.asarray([head]), [r], q])
+    u = getattr(np, name)
+    if name == 'power':
+        # the power of ints is computed as float and converted back to int when integral
+        # (see eval_dyad_power).  Only ints to non-negative int powers are folded, and only
+        # while every result is an exact float, as then each step is exact and the fold
+        # gives the same ints as the dyad applied step by step.
+        if a.ndim != 1 or a.dtype.kind not in 'iu' or not hasattr(u, 'accumulate'):
+            return None
+        if np.asarray(head).dtype.kind not in 'iu' or a[1:].min() < 0:
+            return None
+        r = u.accumulate(a.astype(float))
+        if not (np.abs(r) <= 2**53).all():
+            return None
+        if not accumulate:
+            return np.dtype('int').type(r[-1])
+        r = r.astype(int)
+        r[0] = head
+        return r
+    if not hasattr(u, 'accumulate' if accumulate else 'reduce'):
+        return None
+    return u.accumulate(a) if accumulate else u.reduce(a)
+
+
+def _neutral_operand(f, a, b):
+    """
+
+    Return f(a;b1) and b with its first element replaced by f(a;b1), if the latter is
+    a numeric array which may be folded by _ufunc_fold, otherwise (None, None).
+
+    """
+    if f not in _atomic_dyads or not _is_numeric_array(b) or not (_is_numeric_atom(a) or _is_numeric_array(a)):
+        return None, None
+    r = f(a, b[0])
+    if np.shape(r) != b.shape[1:]:
+        return None, None
+    q = np.concatenate([np.asarray(r)[None], b[1:]])
+    return (r, q) if q.dtype.kind in 'biuf' else (None, None)
+
+
 def eval_adverb_converge(f, a, op):
     """
         f:~a                                                  [Converge]
@@ -184,6 +495,14 @@ def eval_adverb_each_pair(f, a, op):
     """
     if is_atom(a) or (is_iterable(a) and len(a) == 1):
         return a
+    if f in _atomic_dyads and _is_numeric_array(a):
+        if f is not eval_dyad_power:
+            return f(a[:-1], a[1:])
+        # power converts each integral result to int, which fails for inf (see eval_dyad_power)
+        if a.ndim == 1:
+            r = f(a[:-1].astype(float), a[1:])
+            if np.isfinite(r).all():
+                return r
     j = isinstance(a, str)
     a = str_to_chr_arr(a) if j else a
     return kg_asarray([f(x,y) for x,y in zip(a[::],a[1::])])
@@ -228,6 +547,14 @@ def eval_adverb_over(f, a, op):
     if len(a) == 1:
         return a[0]
     # https://docs.cupy.dev/en/stable/reference/ufunc.html
+    if _is_numeric_array(a):
+        if f is eval_dyad_minimum and a.ndim == 1:
+            return np.min(a)
+        elif f is eval_dyad_maximum and a.ndim == 1:
+            return np.max(a)
+        r = _ufunc_fold(f, a)
+        if r is not None:
+            return r
     # TODO: can we use NumPy reduce when CuPy backend primary?
     if isinstance(op, KGOp):
         if safe_eq(op.a,'+'):
@@ -277,6 +604,11 @@ def eval_adverb_over_neutral(f, a, b):
         return a
     if is_atom(b):
         return f(a,b)
+    if len(b) > 1:
+        h, q = _neutral_operand(f, a, b)
+        r = None if q is None else _ufunc_fold(f, q, head=h)
+        if r is not None:
+            return r
     return functools.reduce(f,b[1:],f(a,b[0]))
 
 
@@ -307,6 +639,11 @@ def eval_adverb_scan_over_neutral(f, a, b):
         return a
     if is_atom(b):
         b = [b]
+    if len(b) > 1 and np.shape(a) == np.shape(b)[1:]:
+        h, q = _neutral_operand(f, a, b)
+        r = None if q is None else _ufunc_fold(f, q, accumulate=True, head=h)
+        if r is not None:
+            return np.concatenate([np.asarray(a)[None], r])
     b = [f(a,b[0]), *b[1:]]
     r = list(itertools.accumulate(b,f))
     q = kg_asarray(r)
@@ -320,13 +657,22 @@ def eval_adverb_scan_over(f, a, op):
     """
     if is_atom(a):
         return a
+    # a single element is its own scan, of the same type (truth arrays are widened, see below)
+    if _is_numeric_array(a) and len(a) == 1:
+        return truth_to_int(a)
     # https://docs.cupy.dev/en/stable/reference/ufunc.html
+    if _is_numeric_array(a) and len(a) > 1:
+        r = _ufunc_fold(f, a, accumulate=True)
+        if r is not None:
+            return r
+    # truth arrays are widened as by the arithmetic dyads, as accumulating uint8 gives uint64
+    a = truth_to_int(a)
     if safe_eq(f, eval_dyad_add) and hasattr(np.add, 'accumulate'):
         return np.add.accumulate(a)
     elif safe_eq(f, eval_dyad_subtract) and hasattr(np.subtract, 'accumulate'):
         return np.subtract.accumulate(a)
-    elif safe_eq(f, eval_dyad_multiply) and hasattr(np.multiple, 'accumulate'):
-        return np.multiple.accumulate(a)
+    elif safe_eq(f, eval_dyad_multiply) and hasattr(np.multiply, 'accumulate'):
+        return np.multiply.accumulate(a)
     elif safe_eq(f, eval_dyad_divide) and hasattr(np.divide, 'accumulate'):
         return np.divide.accumulate(a)
     r = list(itertools.accumulate(a, f))
@@ -429,3 +775,11 @@ def eval_adverb_while(klong, f, a, b):
     while klong.eval(KGCall(a, b, arity=1)):
         b = f(b)
     return b
+
+
+_vectorized_adverbs = {
+    eval_adverb_each: eval_adverb_each_vectorized,
+    eval_adverb_each2: eval_adverb_each2_vectorized,
+    eval_adverb_each_left: eval_adverb_each_left_vectorized,
+    eval_adverb_each_right: eval_adverb_each_right_vectorized,
+}
@@ -0,0 +1,221 @@
+from .adverbs import get_adverb_chain_fn
+from .core import *
+from .fusion import KGFused
+from .utils import LRUCache
+
+
+def split_fn_locals(f):
+    """
+
+    Split a function body into its local variable declarations and the program to run.
+
+        {[a b];a::1;b::2;a+b}
+
+    has the locals [a b] and the program a::1;b::2;a+b.
+
+    """
+    if is_list(f) and len(f) > 1 and is_list(f[0]) and len(f[0]) > 0:
+        for q in f[0]:
+            if not isinstance(q, KGSym):
+                return [], f
+        return f[0], f[1:]
+    return [], f
+
+
+class KlongCompiler:
+    """
+
+    Lowers Klong programs (as produced by KlongInterpreter.prog) into trees of Python closures.
+
+    Each node is compiled once into a zero-argument callable which produces the same result
+    as KlongInterpreter.eval (or KlongInterpreter.call) on that node.  The node type is
+    discriminated and operator functions are looked up at compile time, conditionals become
+    direct branches and adverb chains are prebuilt, so the interpretive dispatch is skipped
+    when the program runs.
+
+    Compiled closures are attached to the KGFn and KGCond nodes they were compiled from.
+    Function bodies are plain lists which can not carry attributes, so they are kept in a
+    bounded cache keyed by identity.
+
+    Function invocation (argument binding, projections and the local context) is still
+    performed by KlongInterpreter._eval_fn, which calls back into the compiler for the
+    arguments and the function body.
+
+    Within a function body the frame symbols (x, y, z, .f and the declared locals) are
+    known at compile time.  The function's own frame is always the innermost context
+    while its body runs, so references to them read (and :: writes) that frame directly
+    instead of searching the whole context chain.
+
+    """
+
+    def __init__(self, klong, cache_size=1024):
+        self.klong = klong
+        self._bodies = LRUCache(cache_size)
+        self._fns = LRUCache(cache_size)
+        self._frame_syms = None
+
+    def call(self, x):
+        """
+
+        Equivalent of KlongInterpreter.call using compiled closures.
+
+        """
+        if isinstance(x, (KGFn, KGCond)):
+            c = getattr(x, '_kc_call', None)
+            if c is None or c[0] is not self:
+                c = (self, self.compile_call(x))
+                x._kc_call = c
+            return c[1]()
+        elif type(x) is list:
+            e = self._bodies.get(id(x))
+            if e is None or e[0] is not x:
+                e = (x, self.compile_call(x))
+                self._bodies[id(x)] = e
+            return e[1]()
+        return self.klong.eval(x)
+
+    def compile_fn(self, f):
+        """
+
+        Split a function into its locals and body and compile the body with the frame
+        symbols resolved.  Returns (locals, body, compiled body), where the compiled body
+        is None for Python lambdas.
+
+        """
+        e = self._fns.get(id(f))
+        if e is None or e[0] is not f:
+            f_locals, body = split_fn_locals(f)
+            if issubclass(type(body), KGLambda):
+                fn = None
+            else:
+                self._frame_syms, frame_syms = {*reserved_fn_symbols, reserved_dot_f_symbol, *f_locals}, self._frame_syms
+                try:
+                    fn = self.compile_call(body, tail=True)
+                finally:
+                    self._frame_syms = frame_syms
+            e = (f, f_locals, body, fn)
+            self._fns[id(f)] = e
+        return e[1], e[2], e[3]
+
+    def compile_call(self, x, tail=False):
+        """
+
+        Compile a node with KlongInterpreter.call semantics: functions are invoked.
+
+        """
+        if isinstance(x, KGFn) and not isinstance(x, KGCall) and not x.is_op() and not x.is_adverb_chain():
+            x = KGCall(x.a, x.args, x.arity)
+        return self.compile(x, tail=tail)
+
+    def compile(self, x, tail=False):
+        """
+
+        Compile a node with KlongInterpreter.eval semantics.
+
+        If tail is True the node is in tail position of a function body and a function
+        call is not invoked but returned as a KGTailCall (see KlongInterpreter._eval_fn).
+
+        """
+        if isinstance(x, KGSym):
+            return self._compile_sym(x)
+        elif isinstance(x, KGFn):
+            if x.is_op():
+                return self._compile_op(x)
+            elif x.is_adverb_chain():
+                return self._compile_adverb_chain(x)
+            elif isinstance(x, KGCall):
+                return self._compile_fn_call(x, tail)
+        elif isinstance(x, KGFused):
+            return self._compile_fused(x)
+        elif isinstance(x, KGCond):
+            return self._compile_cond(x, tail)
+        elif isinstance(x, list) and len(x) > 0:
+            return self._compile_prog(x, tail)
+        return lambda: x
+
+    def _compile_sym(self, x):
+        ctx = self.klong._context
+        lookup = self.klong._lookup
+        def _sym():
+            try:
+                return lookup(x)
+            except KeyError:
+                if x not in reserved_fn_symbols:
+                    ctx[x] = x
+                return x
+        if self._frame_syms is None or x not in self._frame_syms:
+            return _sym
+        frames = ctx._context
+        def _frame_sym():
+            v = frames[0].get(x)
+            return _sym() if v is None else v
+        return _frame_sym
+
+    def _compile_op(self, x):
+        f = self.klong._get_op_fn(x.a.a, x.a.arity)
+        fa = x.args if isinstance(x.args, list) else [x.args]
+        if x.a.arity == 1:
+            cx = self.compile(fa[0])
+            return lambda: f(cx())
+        cy = self.compile(fa[1])
+        if x.a.a == '::':
+            n = fa[0]
+            if self._frame_syms is None or n not in self._frame_syms:
+                return lambda: f(n, cy())
+            frames = self.klong._context._context
+            def _frame_define():
+                v = cy()
+                d = frames[0]
+                if n in d:
+                    set_context_var(d, n, v)
+                    return v
+                return f(n, v)
+            return _frame_define
+        cx = self.compile(fa[0])
+        def _dyad():
+            _y = cy()
+            return f(cx(), _y)
+        return _dyad
+
+    def _compile_adverb_chain(self, x):
+        arr = x.a
+        f = get_adverb_chain_fn(self.klong, arr)
+        if arr[-2].arity == 1:
+            ca = self.compile(arr[-1])
+            return lambda: f(ca())
+        ca = self.compile(arr[-1][0])
+        cb = self.compile(arr[-1][1])
+        def _chain():
+            _a = ca()
+            return f(_a, cb())
+        return _chain
+
+    def _compile_fn_call(self, x, tail):
+        if tail:
+            return lambda: KGTailCall(x)
+        eval_fn = self.klong._eval_fn
+        return lambda: eval_fn(x)
+
+    def _compile_fused(self, x):
+        klong = self.klong
+        cl = [self.compile(q) for q in x.leaves]
+        return lambda: x.run(klong, [c() for c in cl])
+
+    def _compile_cond(self, x, tail):
+        c = self.compile_call(x[0])
+        t, e = [self.compile_call(q, tail=tail) for q in x[1:]]
+        def _cond():
+            q = c()
+            return e() if (is_number(q) and q == 0) or is_empty(q) else t()
+        return _cond
+
+    def _compile_prog(self, x, tail):
+        fns = [self.compile_call(q, tail=(tail and i == len(x) - 1)) for i,q in enumerate(x)]
+        if len(fns) == 1:
+            return fns[0]
+        head, last = fns[:-1], fns[-1]
+        def _prog():
+            for f in head:
+                f()
+            return last()
+        return _prog
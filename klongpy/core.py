@@ -1,8 +1,11 @@
 import copy
 import inspect
+import operator
+import re
 import weakref
 from enum import Enum
 import sys
+import threading
 
 from .backend import np
 
@@ -15,13 +18,22 @@ class KlongException(Exception):
     pass
 
 
+def node_state(x):
+    """
+    Return the attributes of the parsed node x without the caches the interpreter and the
+    compiler keep on it (_kg_* and _kc_*), which refer to the interpreter.  Nodes are also
+    values, so they are pickled (e.g. for IPC) and copied by their state.
+    """
+    return {k:v for k,v in x.__dict__.items() if not k.startswith(('_kg_', '_kc_'))}
+
+
 class KGSym(str):
     def __repr__(self):
         return f":{super().__str__()}"
     def __eq__(self, o):
-        return isinstance(o,KGSym) and self.__str__() == o.__str__()
-    def __hash__(self):
-        return super().__hash__()
+        return isinstance(o,KGSym) and str.__eq__(self, o)
+    __hash__ = str.__hash__
+    __getstate__ = node_state
 
 
 def get_fn_arity_str(arity):
@@ -40,6 +52,8 @@ class KGFn:
         self.args = args
         self.arity = arity
 
+    __getstate__ = node_state
+
     def __str__(self):
         return get_fn_arity_str(self.arity)
 
@@ -67,6 +81,15 @@ class KGCall(KGFn):
         return self.a.__str__() if issubclass(type(self.a), KGLambda) else super().__str__()
 
 
+class KGTailCall:
+    """
+    A function call in tail position of a function body.  It is handed back to the
+    caller (KlongInterpreter._eval_fn) to be run in place of a nested call.
+    """
+    def __init__(self, x):
+        self.x = x
+
+
 class KGOp:
     def __init__(self, a, arity):
         self.a = a
@@ -84,7 +107,7 @@ class KGChar(str):
 
 
 class KGCond(list):
-    pass
+    __getstate__ = node_state
 
 
 class KGLambda:
@@ -180,6 +203,17 @@ reserved_fn_symbol_map = {n:KGSym(n) for n in reserved_fn_args}
 reserved_dot_f_symbol = KGSym('.f')
 
 
+def set_context_var(d, sym, v):
+    """
+    Sets a context variable, wrapping Python lambda/functions as appropriate.
+    """
+    assert isinstance(sym, KGSym)
+    if callable(v) and not issubclass(type(v), KGLambda) :
+        x = KGLambda(v)
+        v = KGCall(x,args=None,arity=x.get_arity())
+    d[sym] = v
+
+
 def is_list(x):
     return isinstance(x,list) or (np.isarray(x) and x.ndim > 0)
 
@@ -226,7 +260,49 @@ def in_map(x, v):
         return False
 
 
-def kg_asarray(a):
+_number_types = (int, float, np.integer, np.floating, np.bool_)
+_atom_types = (str, dict, type(None), np.generic, KGFn, KGLambda, KGChannel)
+_shape = operator.attrgetter('shape')
+
+
+def _kg_layout(a):
+    """
+    Scan the elements of the list a once and return how kg_asarray converts it:
+
+        'typed'   np.asarray(a) is a (possibly multi-dimensional) array of numbers
+        'scalars' a only contains atoms, but not only numbers: a 1-D object array
+        'vector'  a contains arrays of differing lengths, or arrays and atoms: a 1-D object array
+        'nested'  like 'vector', but a also contains lists, which are converted first
+        None      anything else, which is left to numpy to discover
+
+    """
+    if len(a) == 0:
+        return 'typed'
+    ts = set(map(type, a))
+    if all(issubclass(t, _number_types) for t in ts):
+        return 'typed'
+    seqs = [t for t in ts if t is list or t is np.ndarray]
+    if len(seqs) == 0:
+        return 'scalars' if all(issubclass(t, _number_types + _atom_types) for t in ts) else None
+    if len(seqs) < len(ts):
+        if not all(issubclass(t, _number_types + _atom_types) for t in ts if t not in seqs):
+            return None
+        if not all(x.ndim > 0 for x in a if type(x) is np.ndarray):
+            return None
+        return 'nested' if list in ts else 'vector'
+    if seqs == [np.ndarray]:
+        shapes = set(map(_shape, a))
+        if len(shapes) == 1:
+            return 'typed'
+        return 'vector' if all(len(q) == 1 for q in shapes) else None
+    if len(set(map(len, a))) > 1:
+        return 'nested' if all(x.ndim == 1 for x in a if type(x) is np.ndarray) else None
+    if all(type(x) is list and all(type(q) in (int, float) for q in x) for x in a):
+        return 'typed'
+    return None
+
+
+def kg_asarray(a, homogeneous=False):
     """
     Converts input data into a NumPy array, ensuring all sub-arrays are also NumPy arrays, to meet the requirements of KlongPy.
 
@@ -234,28 +310,53 @@ def kg_asarray(a):
     sub-arrays of the input data are converted into NumPy arrays. This function attempts to achieve this, while handling
     unpredictable and complex data structures that may result from prior manipulations to the data.
 
-    The function first tries to convert the input data into a NumPy array. In the case of a jagged structure
-    (i.e., irregularly-shaped sub-arrays), it defaults to the object data type. If the initial conversion is unsuccessful,
-    it tries to convert the input data to an object dtype array. If all these attempts fail, it converts each element to
-    a list, if it is a NumPy array, or keeps the original element if it is not, and then attempts to convert the whole
-    structure into an object dtype array again.
-
-    Detecting the type in NumPy directly, as opposed to checking it in Python, significantly enhances
-    performance, hence the approach adopted in this function.
+    Lists are scanned once (see _kg_layout) to decide whether they become an array of numbers, an object array of
+    atoms or an object array of (jagged) sub-arrays, so these common layouts are built directly. Only the layouts
+    the scan can not decide are converted by trial: the input data is converted into a NumPy array and, if that
+    fails or produces a non-numeric array, into an object dtype array. If that fails too, each element is converted
+    to a list, if it is a NumPy array, or kept as is, and the whole structure is converted into an object dtype
+    array again.
 
     Parameters
     ----------
     a : list or array-like
         The input data to be converted into a NumPy array.
+    homogeneous : bool
+        The caller knows that the elements of a are numbers, or arrays of the same dtype and number of
+        dimensions (e.g. pieces of an array), so only their lengths decide the layout.
 
     Returns
     -------
     arr : ndarray
         The converted input data as a NumPy array, where all elements and sub-arrays are also NumPy arrays.
     """
+    if type(a) is list:
+        if homogeneous:
+            layout = 'vector' if len(a) > 0 and isinstance(a[0], np.ndarray) and len(set(map(len, a))) > 1 else 'typed'
+        else:
+            layout = _kg_layout(a)
+        if layout == 'scalars' or layout == 'vector':
+            return np.asarray(a, dtype=object)
+        elif layout == 'nested':
+            arr = np.empty(len(a), dtype=object)
+            for i,x in enumerate(a):
+                arr[i] = kg_asarray(x) if isinstance(x,list) else x
+            return arr
+        elif layout is None:
+            return _kg_asarray_trial(a)
+    elif not isinstance(a, np.ndarray):
+        return _kg_asarray_trial(a)
+    arr = np.asarray(a)
+    return arr if arr.dtype.kind in ['O','i','u','f'] else _kg_asarray_trial(a)
+
+
+def _kg_asarray_trial(a):
+    """
+    Convert a by trial (see kg_asarray).
+    """
     try:
         arr = np.asarray(a)
-        if arr.dtype.kind not in ['O','i','f']:
+        if arr.dtype.kind not in ['O','i','u','f']:
             raise ValueError
     except (np.VisibleDeprecationWarning, ValueError):
         try:
@@ -301,6 +402,19 @@ def kg_equal(a, b):
     if na and nb and a.dtype == b.dtype and a.dtype != 'O':
         return np.array_equal(a,b)
 
+    if na and nb and a.dtype.kind in 'iuf' and b.dtype.kind in 'iuf':
+        return a.shape == b.shape and bool(np.isclose(a,b).all())
+
+    if na and nb:
+        t = sym_table()
+        ca = sym_codes(a, t)
+        if ca is not None:
+            cb = sym_codes(b, t)
+            if cb is not None:
+                return np.array_equal(ca, cb)
+        if is_str_arr(a) and is_str_arr(b):
+            return a.tolist() == b.tolist()
+
     na, nb = na or isinstance(a,list), nb or isinstance(b,list)
 
     if na != nb:
@@ -432,6 +546,85 @@ def vec_fn2(a, b, f):
     return f(a,b)
 
 
+_dtype = operator.attrgetter('dtype')
+_ndim = operator.attrgetter('ndim')
+
+
+def ragged(a):
+    """
+    Return (values, offsets) if a is a jagged list of numbers, i.e. a 1-D object array of 1-D
+    numeric arrays of the same dtype but not all of the same length, otherwise None.
+
+    values is the concatenation of the elements of a and element i of a is values[offsets[i]:offsets[i+1]].
+    Truth values are widened to integers (see truth_to_int).
+    """
+    if not (isinstance(a, np.ndarray) and a.dtype == object and a.ndim == 1 and len(a) > 1):
+        return None
+    x = a[0]
+    if not (isinstance(x, np.ndarray) and x.ndim == 1 and x.dtype.kind in 'iuf'):
+        return None
+    if set(map(type, a)) != {type(x)} or set(map(_dtype, a)) != {x.dtype} or set(map(_ndim, a)) != {1}:
+        return None
+    n = np.fromiter(map(len, a), dtype=np.intp, count=len(a))
+    if (n == n[0]).all():
+        return None
+    return truth_to_int(np.concatenate(a)), np.concatenate([[0], np.cumsum(n)])
+
+
+def unragged(values, offsets):
+    """
+    Return the jagged list of the given values and offsets (see ragged).
+    """
+    r = np.empty(len(offsets)-1, dtype=object)
+    o = offsets.tolist()
+    for i in range(len(r)):
+        r[i] = values[o[i]:o[i+1]]
+    return r
+
+
+def ragged_fn(a, f):
+    """
+    Apply the atomic function `f` to all numbers of the jagged list `a` (see ragged) in a single call.
+
+    Returns None if `a` is not a jagged list.
+    """
+    r = ragged(a)
+    if r is None:
+        return None
+    v = f(r[0])
+    return unragged(v, r[1]) if np.isarray(v) and v.shape == r[0].shape else None
+
+
+def ragged_fn2(a, b, f):
+    """
+    Apply the atomic function `f` to all numbers of the jagged lists `a` and/or `b` (see ragged)
+    in a single call.  The other argument may be a number, a list with a number for each element
+    of the jagged list or a jagged list of the same shape.
+
+    Returns None if neither `a` nor `b` is a jagged list or the arguments do not conform.
+    """
+    ra = ragged(a)
+    rb = ragged(b)
+    if ra is None and rb is None:
+        return None
+    if ra is not None and rb is not None:
+        if not np.array_equal(ra[1], rb[1]):
+            return None
+        v, o, x, y = ra[0], ra[1], ra[0], rb[0]
+    else:
+        v, o = ra if ra is not None else rb
+        q = b if ra is not None else a
+        if np.isarray(q):
+            if not (q.ndim == 1 and q.dtype.kind in 'iuf' and len(q) == len(o)-1):
+                return None
+            q = np.repeat(q, np.diff(o))
+        elif not (type(q) in (int, float) or (isinstance(q, np.number) and q.dtype.kind in 'iuf')):
+            return None
+        x, y = (v, q) if ra is not None else (q, v)
+    r = f(x, y)
+    return unragged(r, o) if np.isarray(r) and r.shape == v.shape else None
+
+
 def is_symbolic(c):
     return isinstance(c, str) and (c.isalpha() or c.isdigit() or c == '.')
 
@@ -445,8 +638,30 @@ def is_atom(x):
     return is_empty(x) if is_iterable(x) else True
 
 
+def is_str_arr(x):
+    """ True if x is a non-empty 1-D object array of strings, characters or symbols. """
+    return isinstance(x, np.ndarray) and x.dtype == object and x.ndim == 1 and len(x) > 0 and all(issubclass(t, str) for t in set(map(type, x)))
+
+
 def kg_truth(x):
-    return x*1
+    """
+    Return the truth value x (e.g. the result of a comparison) as 0 or 1.
+
+    Arrays of truth values are kept as compact uint8 arrays of 0 and 1, which index, compare
+    and print as Klong integers.  Arithmetic would wrap around in uint8 (e.g. 0-1), so the
+    arithmetic operators and Amend widen them first (see truth_to_int), and so do Min and Max
+    unless both of their operands are uint8.
+    """
+    return x.view(np.uint8) if isinstance(x, np.ndarray) and x.dtype == bool else x*1
+
+
+def truth_to_int(a):
+    """
+    Return a uint8 array (or scalar) as a default integer array (or int), anything else as it is.
+    """
+    if isinstance(a, np.ndarray):
+        return a.astype(int) if a.dtype == np.uint8 else a
+    return int(a) if type(a) is np.uint8 else a
 
 
 # TODO: can we just transform chars to ints so that CuPy works?
@@ -455,22 +670,144 @@ def str_to_chr_arr(s):
     return np.asarray([KGChar(x) for x in s],dtype=object)
 
 
+# Operations which only move, select or compare the characters of a string work on
+# an array of its code points instead of an object array of KGChar (see str_to_chr_arr).
+def str_to_code_arr(s):
+    """
+    Return the code points of the characters of s as a (read-only) uint32 array.
+    """
+    return np.frombuffer(s.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+
+
+def code_arr_to_str(a):
+    """
+    Return the string of the code points in a (see str_to_code_arr).  Arrays of more than one
+    dimension are returned as arrays of the strings along the last dimension.
+    """
+    a = np.asarray(a, dtype=np.uint32)
+    if a.ndim > 1:
+        return np.asarray([code_arr_to_str(x) for x in a], dtype=object)
+    return a.tobytes().decode('utf-32-le', 'surrogatepass')
+
+
+class SymbolTable:
+    """
+    Maps each symbol to a small integer code (and back), so arrays of symbols can be
+    compared, grouped and sorted as integer arrays.  Codes are only comparable with codes
+    from the same table.
+    """
+    def __init__(self):
+        self.codes = {}
+        self.names = []
+        self._lock = threading.Lock()
+
+    def intern(self, x):
+        """
+        Return the code of the symbol x, adding it to the table if needed.
+        """
+        x = str.__str__(x)
+        c = self.codes.get(x)
+        if c is None:
+            with self._lock:
+                c = self.codes.setdefault(x, len(self.names))
+                if c == len(self.names):
+                    self.names.append(x)
+        return c
+
+
+# Symbols are interned in a table shared by all interpreters.  Once it holds
+# max_sym_table_size symbols a new table is started, so that it does not grow without
+# bound; an operation takes the table once (see sym_table) and uses it for all its codes.
+max_sym_table_size = 1 << 20
+_sym_table = SymbolTable()
+_sym_table_lock = threading.Lock()
+
+
+def sym_table():
+    """
+    Return the current symbol table.
+    """
+    global _sym_table
+    t = _sym_table
+    if len(t.names) >= max_sym_table_size:
+        with _sym_table_lock:
+            if _sym_table is t:
+                _sym_table = SymbolTable()
+            t = _sym_table
+    return t
+
+
+def intern_sym(x, t=None):
+    """
+    Return the code of the symbol x in the symbol table t (by default the current one).
+    """
+    return (sym_table() if t is None else t).intern(x)
+
+
+def sym_codes(a, t=None):
+    """
+    Return the codes of the elements of the 1-D array a in the symbol table t (by default
+    the current one) as an int32 array if all of them are symbols, otherwise None.
+    """
+    if not (isinstance(a, np.ndarray) and a.dtype == object and a.ndim == 1 and len(a) > 0 and type(a[0]) is KGSym):
+        return None
+    if set(map(type, a)) != {KGSym}:
+        return None
+    t = sym_table() if t is None else t
+    # the table is keyed by plain strings, so lookups do not call KGSym.__eq__
+    try:
+        return np.fromiter(map(t.codes.__getitem__, map(str.__str__, a)), dtype=np.int32, count=len(a))
+    except KeyError:
+        for x in set(map(str.__str__, a)):
+            t.intern(x)
+    return np.fromiter(map(t.codes.__getitem__, map(str.__str__, a)), dtype=np.int32, count=len(a))
+
+
+def sym_ranks(a):
+    """
+    Return the lexical ranks of the elements of a if all of them are symbols, otherwise None.
+    Equal symbols have equal ranks and ranks sort in the same order as the symbols.
+    """
+    t = sym_table()
+    c = sym_codes(a, t)
+    if c is None:
+        return None
+    u, i = np.unique(c, return_inverse=True)
+    r = np.empty(len(u), dtype=np.int32)
+    r[np.argsort(np.asarray([t.names[x] for x in u], dtype=str), kind='stable')] = np.arange(len(u), dtype=np.int32)
+    return r[i]
+
+
+# Lexemes are scanned with precompiled regular expressions so that each lexeme is
+# consumed by a single match instead of a Python loop over its characters.
+_re_num = re.compile(r'-?[\d.]*(?:e-?[\d.]*)*')
+_re_sym = re.compile(r'[^\W_]*(?:\.[^\W_]*)*')
+_re_string = re.compile(r'[^"]*(?:""[^"]*)*')
+_re_string_end = re.compile(r'[^"]*(?:""[^"]*)*(?:"|\Z)')
+_re_shifted_comment = r':"[^"]*(?:""[^"]*)*(?:"|\Z)'
+_re_skip = re.compile(r'[^\S\n]*(?:' + _re_shifted_comment + r'[^\S\n]*)*')
+_re_skip_newline = re.compile(r'\s*(?:' + _re_shifted_comment + r'[^\S\n]*)*')
+_re_space = re.compile(r'[^\S\n]*')
+_re_space_newline = re.compile(r'\s*')
+# ASCII white space only, which is what np.fromstring separates numbers by (see read_num_run)
+_re_num_run = re.compile(r'(?:\s*-?[0-9][0-9.]*(?:e-?[0-9.]*)*(?=[\s\]}]|\Z))+', re.ASCII)
+_re_big_int = re.compile(r'[0-9]{19}')
+
+
 def read_num(t, i=0):
-    p = i
-    use_float = False
-    if t[i] == '-':
-        i += 1
-    while i < len(t):
-        if t[i] == '.':
-            use_float = True
-        elif t[i] == 'e':
-            use_float = True
-            if cmatch(t,i+1,'-'):
-                i += 2
-        elif not t[i].isnumeric():
-            break
-        i += 1
-    return i, float(t[p:i]) if use_float else int(t[p:i])
+    j = _re_num.match(t, i).end()
+    x = t[i:j]
+    return j, float(x) if ('.' in x or 'e' in x) else int(x)
+
+
+def read_num_run(x):
+    """
+        Convert a run of white space separated numbers (as matched by _re_num_run)
+        into a NumPy array in one shot.  Integers must fit in int64.
+    """
+    if '.' in x or 'e' in x:
+        return np.array(x.split(), dtype=float)
+    return np.fromstring(x, dtype=np.int64, sep=' ')
 
 
 def read_char(t, i):
@@ -481,11 +818,9 @@ def read_char(t, i):
 
 
 def read_sym(t, i=0, module=None):
-    p = i
-    while i < len(t) and is_symbolic(t[i]):
-        i += 1
-    x = t[p:i]
-    return i, reserved_fn_symbol_map.get(x) or KGSym(x if x.startswith('.') or module is None else f"{x}`{module}")
+    j = _re_sym.match(t, i).end()
+    x = t[i:j]
+    return j, reserved_fn_symbol_map.get(x) or KGSym(x if x.startswith('.') or module is None else f"{x}`{module}")
 
 
 def read_op(t, i=0):
@@ -495,14 +830,7 @@ def read_op(t, i=0):
 
 
 def read_shifted_comment(t, i=0):
-    while i < len(t):
-        c = t[i]
-        if c == '"':
-            i += 1
-            if not cmatch(t,i,'"'):
-                break
-        i += 1
-    return i
+    return _re_string_end.match(t, i).end()
 
 
 def read_sys_comment(t,i,a):
@@ -537,17 +865,15 @@ def skip_space(t, i=0, ignore_newline=False):
         except in functions, dictionaries, conditional expressions,
         and lists. So
     """
-    while i < len(t) and (t[i].isspace() and (ignore_newline or t[i] != '\n')):
-        i += 1
-    return i
+    return (_re_space_newline if ignore_newline else _re_space).match(t, i).end()
 
 
 def skip(t, i=0, ignore_newline=False):
-    i = skip_space(t,i,ignore_newline=ignore_newline)
-    if cmatch2(t, i, ':', '"'):
-        i = read_shifted_comment(t, i+2)
-        i = skip(t, i)
-    return i
+    """
+        Skip white space and shifted comments (:"...").  Only the white space
+        preceding the first comment honors ignore_newline.
+    """
+    return (_re_skip_newline if ignore_newline else _re_skip).match(t, i).end()
 
 
 def read_list(t, delim, i=0, module=None, level=1):
@@ -562,6 +888,15 @@ def read_list(t, delim, i=0, module=None, level=1):
     arr = []
     i = skip(t,i,ignore_newline=True)
     while not cmatch(t,i,delim) and i < len(t):
+        # runs of numbers are read in bulk
+        m = _re_num_run.match(t, i)
+        if m is not None:
+            i = skip(t,m.end(),ignore_newline=True)
+            if len(arr) == 0 and cmatch(t,i,delim) and _re_big_int.search(m.group()) is None:
+                aa = read_num_run(m.group())
+                return i+1, (aa if level == 1 else aa.tolist())
+            arr.extend(read_num(q)[1] for q in m.group().split())
+            continue
         # we can knowingly read neg numbers in list context
         i, q = kg_read(t, i, read_neg=True, ignore_newline=True, module=module, list_level=level+1)
         if q is None:
@@ -595,19 +930,13 @@ def read_string(t, i=0):
                 "say ""hello""!"
 
     Note: this comforms to the KG read_string impl.
-          perf tests show that the final join is fast for short strings
 
     """
-    r = []
-    while i < len(t):
-        c = t[i]
-        if c == '"':
-            i += 1
-            if not cmatch(t,i,'"'):
-                break
-        r.append(c)
-        i += 1
-    return i,"".join(r)
+    j = _re_string.match(t, i).end()
+    r = t[i:j]
+    if '""' in r:
+        r = r.replace('""', '"')
+    return (j+1 if j < len(t) else j), r
 
 
 def read_cond(klong, t, i=0):
@@ -644,7 +973,40 @@ def list_to_dict(a):
     return {x[0]:x[1] for x in a}
 
 
-copy_lambda = KGLambda(lambda x: copy.deepcopy(x))
+def copy_dict_literal(x):
+    """
+    Copy the dictionary literal x.  Klong mutates dictionaries in place (join, drop) and
+    the values may be changed by Python callers, so numeric array values are copied and
+    container values (lists and object arrays) are copied deeply.  Atoms are shared.
+    """
+    r = {}
+    for k,v in x.items():
+        if isinstance(v, list) or (isinstance(v, np.ndarray) and v.dtype == object):
+            v = copy.deepcopy(v)
+        elif isinstance(v, np.ndarray):
+            v = v.copy()
+        r[k] = v
+    return r
+
+
+# Dictionary literals are copied on each evaluation (see copy_dict_literal).
+copy_lambda = KGLambda(lambda x: copy_dict_literal(x))
+
+
+# Lexeme classes keyed by the first character of a lexeme (see kg_read).
+# Characters that are not in the table are classified by their unicode category.
+_LX_SEP, _LX_DELIM, _LX_NUM, _LX_STR, _LX_COLON, _LX_LIST, _LX_SYM, _LX_MINUS, _LX_OP = range(9)
+_lexeme_class = {
+    '\n': _LX_SEP, ';': _LX_SEP,
+    **{c: _LX_DELIM for c in '(){}]'},
+    **{c: _LX_NUM for c in '0123456789'},
+    '"': _LX_STR,
+    ':': _LX_COLON,
+    '[': _LX_LIST,
+    **{c: _LX_SYM for c in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ.'},
+    '-': _LX_MINUS,
+    **{c: _LX_OP for c in '!#$%&\'*+,<=>?@\\^_`|~/'},
+}
 
 def kg_read(t, i=0, read_neg=False, ignore_newline=False, module=None, list_level=0):
     """
@@ -694,17 +1056,20 @@ def kg_read(t, i=0, read_neg=False, ignore_newline=False, module=None, list_leve
     if i >= len(t):
         return i, None
     a = t[i]
-    if a in ['\n', ';']:
+    c = _lexeme_class.get(a)
+    if c is None:
+        c = _LX_NUM if a.isnumeric() else _LX_SYM if is_symbolic(a) else _LX_OP
+    if c == _LX_SYM:
+        return read_sym(t, i, module=module)
+    elif c == _LX_NUM:
+        return read_char(t, i) if a == '0' and cmatch(t, i+1, 'c') else read_num(t, i)
+    elif c == _LX_SEP:
         return i+1,';'
-    elif a in ['(',')','{','}',']']:
+    elif c == _LX_DELIM:
         return i+1,a
-    elif cmatch2(t, i, '0', 'c'):
-        return read_char(t, i)
-    elif a.isnumeric() or (read_neg and (a == '-' and (i+1) < len(t) and t[i+1].isnumeric())):
-        return read_num(t, i)
-    elif a == '"':
+    elif c == _LX_STR:
         return read_string(t, i+1)
-    elif a == ':' and (i+1 < len(t)):
+    elif c == _LX_COLON and (i+1 < len(t)):
         aa = t[i+1]
         if aa.isalpha() or aa == '.':
             return read_sym(t, i=i+1, module=module)
@@ -719,10 +1084,10 @@ def kg_read(t, i=0, read_neg=False, ignore_newline=False, module=None, list_leve
         elif aa == '|':
             return i+2,':|'
         return i+2,KGOp(f":{aa}",arity=0)
-    elif safe_eq(a, '['):
+    elif c == _LX_LIST:
         return read_list(t, ']', i=i+1, module=module, level=list_level+1)
-    elif is_symbolic(a):
-        return read_sym(t, i, module=module)
+    elif c == _LX_MINUS and read_neg and (i+1) < len(t) and t[i+1].isnumeric():
+        return read_num(t, i)
     return read_op(t,i)
 
 
@@ -817,6 +1182,10 @@ def kg_argsort(a, descending=False):
     """
     if not is_iterable(a) or len(a) == 0:
         return a
+    r = sym_ranks(a)
+    if r is not None:
+        r = np.argsort(r, kind='stable')
+        return r[::-1] if descending else r
     def _e(x):
         return (-np.inf,x) if is_empty(a[x]) else (np.max(a[x]),x) if is_list(a[x]) else (a[x],x)
     return np.asarray(sorted(range(len(a)), key=_e, reverse=descending))
@@ -936,30 +1305,3 @@ def merge_projections(arr):
             i += 1
         k += 1
     return sparse_fa
-
-
-def get_fn_arity(f):
-    """
-    Examine a function AST and infer arity by looking for x,y and z.
-    This arity is needed to populate the KGFn.
-
-    NOTE: TODO: it maybe easier / better to do this at parse time vs late.
-    """
-    if isinstance(f,KGFn) and isinstance(f.a,KGSym) and not in_map(f.a,reserved_fn_symbols):
-       return sum(1 for x in set(f.args) if in_map(x, reserved_fn_symbols) or (x is None))
-    def _e(f, level=0):
-        if isinstance(f,KGFn):
-            x = _e(f.a, level=1)
-            if isinstance(f.args,list):
-                for q in f.args:
-                    x.update(_e(q,level=1))
-        elif isinstance(f,list):
-            x = set()
-            for q in f:
-                x.update(_e(q,level=1))
-        elif isinstance(f,KGSym):
-            x = set([f]) if f in reserved_fn_symbols else set()
-        else:
-            x = set()
-        return x if level else len(x)
-    return _e(f)
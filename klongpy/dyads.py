@@ -1,7 +1,86 @@
 from .core import *
+import itertools
+import operator
 import sys
 
 
+# Python int and float operands skip the NumPy ufunc dispatch in the arithmetic and
+# comparison dyads.  Anything else, including NumPy scalars, takes the NumPy path, as
+# do int results outside of int64, so that atoms wrap as arrays do.
+_scalar_types = (int, float)
+_int64_min, _int64_max = -2**63, 2**63-1
+
+
+def _is_int64(r):
+    return type(r) is not int or _int64_min <= r <= _int64_max
+
+
+def _ragged_ufunc(u, a, b):
+    """
+    Apply the ufunc u to a and b, through the numbers of a jagged list when the other argument
+    is a number or a list (see ragged_fn2).  u already applies itself to each pair of elements
+    of two lists of lists in a single call.
+    """
+    if np.isarray(a) and np.isarray(b) and a.dtype == object and b.dtype == object:
+        return u(a, b)
+    r = ragged_fn2(a, b, u)
+    return u(a, b) if r is None else r
+
+
+def _operand_kind(x):
+    """
+    Return 'n' for numbers and numeric arrays, 's' for strings, characters, symbols and
+    (non-empty, 1-D) lists of them, otherwise None.
+    """
+    if isinstance(x, np.ndarray):
+        if x.dtype.kind in 'biuf':
+            return 'n'
+        return 's' if is_str_arr(x) else None
+    if type(x) in _scalar_types or isinstance(x, (np.integer, np.floating)):
+        return 'n'
+    return 's' if isinstance(x, str) else None
+
+
+def _compare(u, op, a, b):
+    """
+    Compare a and b directly instead of through vec_fn2: numbers and numeric arrays with the
+    ufunc u, and lists of strings, characters or symbols (with such an atom or a list of the
+    same length) with the operator op in a single pass.  Returns None for any other data,
+    e.g. mixed or nested lists.
+    """
+    k = _operand_kind(a)
+    if k is None or k != _operand_kind(b):
+        return None
+    if k == 'n':
+        return kg_truth(u(a, b))
+    na, nb = isinstance(a, np.ndarray), isinstance(b, np.ndarray)
+    if na and nb:
+        if len(a) != len(b):
+            return None
+        r = map(op, a, b)
+    elif na:
+        r = map(op, a, itertools.repeat(b))
+    elif nb:
+        r = map(op, itertools.repeat(a), b)
+    else:
+        return None
+    return kg_truth(np.fromiter(r, dtype=bool, count=len(a) if na else len(b)))
+
+
+def _min_max_operands(a, b):
+    """
+    Min and Max of two uint8 arrays (e.g. masks combined with & and |) can not overflow and
+    stay compact, any other mix is widened (see truth_to_int) so that e.g. mask|300 is an int.
+    """
+    if _is_uint8(a) and _is_uint8(b):
+        return a, b
+    return truth_to_int(a), truth_to_int(b)
+
+
+def _is_uint8(x):
+    return (isinstance(x, np.ndarray) and x.dtype == np.uint8) or type(x) is np.uint8
+
+
 def eval_dyad_add(a, b):
     """
 
@@ -17,7 +96,11 @@ def eval_dyad_add(a, b):
                   1+0.3  -->  1.3
 
     """
-    return np.add(a, b)
+    if type(a) in _scalar_types and type(b) in _scalar_types:
+        r = a + b
+        if _is_int64(r):
+            return r
+    return _ragged_ufunc(np.add, truth_to_int(a), truth_to_int(b))
 
 
 def eval_dyad_amend(a, b):
@@ -51,6 +134,14 @@ def eval_dyad_amend(a, b):
     if len(b) <= 1:
         return a
     if isinstance(a, str):
+        r = str_to_code_arr(a).copy()
+        q = str_to_code_arr(b[0])
+        try:
+            for i in b[1:]:
+                r[i:i+len(q)] = q
+            return code_arr_to_str(r)
+        except ValueError:
+            pass # b1 does not fit into "a" and the string grows
         r = str_to_chr_arr(a)
         q = str_to_chr_arr(b[0])
         for i in b[1:]:
@@ -65,7 +156,7 @@ def eval_dyad_amend(a, b):
                 else:
                     r[i] = b[0]
         return "".join(["".join(x) for x in r])
-    r = np.array(a) # clone
+    r = np.array(truth_to_int(a)) # clone
     if is_list(b[0]): # TOOD: use np.put if we can
         r = r.tolist()
         for i in b[1:]:
@@ -83,7 +174,7 @@ def _e_dyad_amend_in_depth(p, q, v):
         p[q[0]] = r
         return p
     else:
-        p = np.array(p, dtype=object) if isinstance(v, (str, KGSym)) else np.array(p)
+        p = np.array(p, dtype=object) if isinstance(v, (str, KGSym)) else np.array(truth_to_int(p))
         p[q] = v
         return p
 
@@ -127,12 +218,12 @@ def eval_dyad_cut(a, b):
 
     """
     j = isinstance(b, str)
-    b = np.asarray(str_to_chr_arr(b) if j else b)
+    b = str_to_code_arr(b) if j else np.asarray(b)
     a = a if np.isarray(a) else [a]
     r = np.array_split(b, a)
     if len(b) == 0 and len(a) > 0:
         r = r[1:]
-    return np.asarray(["".join(x) for x in r]) if j else kg_asarray(r)
+    return np.asarray([code_arr_to_str(x) for x in r], dtype=object) if j else kg_asarray(r, homogeneous=True)
 
 
 def eval_dyad_at_index(klong, a, b):
@@ -169,6 +260,8 @@ def eval_dyad_at_index(klong, a, b):
         b = [x for x in b] if np.isarray(b) else b
         return klong.eval(KGCall(a, b, arity=1))
     j = isinstance(a,str)
+    if j and np.isarray(b) and b.ndim == 1 and b.dtype.kind in 'iu':
+        return code_arr_to_str(str_to_code_arr(a)[b])
     a = str_to_chr_arr(a) if j else a
     if is_list(b):
         if is_empty(b):
@@ -218,7 +311,9 @@ def eval_dyad_divide(a, b):
                   10%8  -->  1.25
 
     """
-    return np.divide(a, b)
+    if type(a) in _scalar_types and type(b) in _scalar_types and b != 0:
+        return a / b
+    return _ragged_ufunc(np.divide, a, b)
 
 
 def eval_dyad_drop(a, b):
@@ -275,9 +370,37 @@ def eval_dyad_equal(a, b):
                   [1 2 3]=[1 4 3]  -->  [1 0 1]
 
     """
+    if type(a) in _scalar_types and type(b) in _scalar_types:
+        return 1 if a == b else 0
+    r = _sym_equal(a, b)
+    if r is None:
+        r = _compare(np.equal, operator.eq, a, b)
+    if r is None:
+        r = ragged_fn2(a, b, lambda x,y: kg_truth(np.equal(x,y)))
+    if r is not None:
+        return r
     return vec_fn2(a, b, lambda x, y: kg_truth(np.asarray(x,dtype=object) == np.asarray(y,dtype=object)))
 
 
+def _sym_equal(a, b):
+    """
+    Compare arrays of symbols (with a symbol or an array of symbols of the same length) by
+    their codes in the symbol table, or return None if a and b are not of that kind.
+    """
+    if isinstance(a, KGSym):
+        a, b = b, a
+    t = sym_table()
+    ca = sym_codes(a, t)
+    if ca is None:
+        return None
+    if isinstance(b, KGSym):
+        return kg_truth(ca == intern_sym(b, t))
+    cb = sym_codes(b, t)
+    if cb is None or len(ca) != len(cb):
+        return None
+    return kg_truth(ca == cb)
+
+
 def finditer(s, sub):
     i = 0
     while True:
@@ -321,7 +444,12 @@ def eval_dyad_find(a, b):
     elif is_dict(a):
         v = a.get(b)
         return np.inf if v is None else v
-    if is_list(b):
+    if isinstance(b, KGSym):
+        t = sym_table()
+        c = sym_codes(a, t)
+        if c is not None:
+            return np.where(c == intern_sym(b, t))[0]
+    if is_list(b) or isinstance(b, KGSym):
         return np.asarray([i for i,x in enumerate(a) if kg_equal(x,b)])
     return np.where(np.asarray(a) == b)[0]
 
@@ -474,7 +602,7 @@ def eval_dyad_integer_divide(a, b):
                   10:%8  -->  1
 
     """
-    return vec_fn2(a, b, _e_dyad_integer_divide)
+    return vec_fn2(truth_to_int(a), truth_to_int(b), _e_dyad_integer_divide)
 
 
 def _arr_to_list(a):
@@ -569,6 +697,13 @@ def eval_dyad_less(a, b):
                    [1 2 3]<[1 4 3]  -->  [0 1 0]
 
     """
+    if type(a) in _scalar_types and type(b) in _scalar_types:
+        return 1 if a < b else 0
+    r = _compare(np.less, operator.lt, a, b)
+    if r is None:
+        r = ragged_fn2(a, b, lambda x,y: kg_truth(np.less(x,y)))
+    if r is not None:
+        return r
     return kg_truth(vec_fn2(a, b, lambda x,y: x < y if (isinstance(x,str) and isinstance(y,str)) else np.less(x,y)))
 
 
@@ -633,7 +768,9 @@ def eval_dyad_maximum(a, b):
                     1.0|1.1  -->  1.1
 
     """
-    return np.maximum(a, b)
+    a, b = _min_max_operands(a, b)
+    r = ragged_fn2(a, b, np.maximum)
+    return np.maximum(a, b) if r is None else r
 
 
 def eval_dyad_minimum(a, b):
@@ -660,7 +797,9 @@ def eval_dyad_minimum(a, b):
                     1.0&1.1  -->  1.0
 
     """
-    return np.minimum(a, b)
+    a, b = _min_max_operands(a, b)
+    r = ragged_fn2(a, b, np.minimum)
+    return np.minimum(a, b) if r is None else r
 
 
 def eval_dyad_more(a, b):
@@ -682,6 +821,13 @@ def eval_dyad_more(a, b):
                    [1 4 3]>[1 2 3]  -->  [0 1 0]
 
     """
+    if type(a) in _scalar_types and type(b) in _scalar_types:
+        return 1 if a > b else 0
+    r = _compare(np.greater, operator.gt, a, b)
+    if r is None:
+        r = ragged_fn2(a, b, lambda x,y: kg_truth(np.greater(x,y)))
+    if r is not None:
+        return r
     return kg_truth(vec_fn2(a, b, lambda x,y: x > y if (isinstance(x,str) and isinstance(y,str)) else np.greater(x,y)))
 
 
@@ -699,7 +845,11 @@ def eval_dyad_multiply(a, b):
                   0.3*7  -->  2.1
 
     """
-    return np.multiply(a, b)
+    if type(a) in _scalar_types and type(b) in _scalar_types:
+        r = a * b
+        if _is_int64(r):
+            return r
+    return _ragged_ufunc(np.multiply, truth_to_int(a), truth_to_int(b))
 
 
 def _e_dyad_power(a,b):
@@ -726,7 +876,7 @@ def eval_dyad_power(a, b):
                   2^0.5  -->  1.41421356237309504
 
     """
-    return vec_fn2(a, b, _e_dyad_power)
+    return vec_fn2(truth_to_int(a), truth_to_int(b), _e_dyad_power)
 
 
 def eval_dyad_remainder(a, b):
@@ -747,7 +897,7 @@ def eval_dyad_remainder(a, b):
                    -7!-5  --> -2
 
     """
-    return np.fmod(a, b)
+    return np.fmod(truth_to_int(a), truth_to_int(b))
 
 
 def eval_dyad_reshape(a, b):
@@ -798,7 +948,7 @@ def eval_dyad_reshape(a, b):
 
     """
     j = isinstance(b, str)
-    b = str_to_chr_arr(b) if j else b
+    b = str_to_code_arr(b) if j else b
     if np.isarray(a):
         if np.isarray(b):
             y = np.where(a < 0)[0]
@@ -812,8 +962,6 @@ def eval_dyad_reshape(a, b):
                 b = np.concatenate((b, b[:a_s - b.size]))
                 b_s = b.size
                 r = b.reshape(a)
-                r = np.asarray(["".join(x) for x in r]) if j else r
-                j = False
             elif a_s == b_s:
                 r = b.reshape(a)
             else:
@@ -832,7 +980,7 @@ def eval_dyad_reshape(a, b):
                 r = np.concatenate((np.tile(b,ns), b[:a - b.shape[0]*ns[0]]))
         else:
             r = np.full((a,), b)
-    return "".join(r) if j else r
+    return code_arr_to_str(r) if j else r
 
 
 def eval_dyad_rotate(a, b):
@@ -862,9 +1010,9 @@ def eval_dyad_rotate(a, b):
     if a == 0 or not is_iterable(b):
         return b
     j = isinstance(b, str)
-    b = str_to_chr_arr(b) if j else b
+    b = str_to_code_arr(b) if j else b
     r = np.roll(b, a)
-    return "".join(r) if j else r
+    return code_arr_to_str(r) if j else r
 
 
 def eval_dyad_split(a, b):
@@ -889,7 +1037,7 @@ def eval_dyad_split(a, b):
         return np.asarray([])
 
     j = isinstance(b, str)
-    b = str_to_chr_arr(b) if j else b
+    b = str_to_code_arr(b) if j else b
 
     a = a if np.isarray(a) else [a]
     if len(a) == 1:
@@ -910,7 +1058,7 @@ def eval_dyad_split(a, b):
             if p >= len(a):
                 p = 0
 
-    return np.asarray(["".join(x) for x in r],dtype=object) if j else kg_asarray(r)
+    return np.asarray([code_arr_to_str(x) for x in r],dtype=object) if j else kg_asarray(r, homogeneous=np.isarray(b))
 
 
 def eval_dyad_subtract(a, b):
@@ -928,7 +1076,11 @@ def eval_dyad_subtract(a, b):
                   1-0.3  -->  0.7
 
     """
-    return np.subtract(a, b)
+    if type(a) in _scalar_types and type(b) in _scalar_types:
+        r = a - b
+        if _is_int64(r):
+            return r
+    return _ragged_ufunc(np.subtract, truth_to_int(a), truth_to_int(b))
 
 
 def eval_dyad_take(a, b):
@@ -955,13 +1107,13 @@ def eval_dyad_take(a, b):
 
     """
     j = isinstance(b,str)
-    b = str_to_chr_arr(b) if j else np.asarray(b)
+    b = str_to_code_arr(b) if j else np.asarray(b)
     aa = np.abs(a)
     if aa > b.size:
         b = np.tile(b,aa // len(b))
         b = np.concatenate((b, b[:aa-b.size]) if a > 0 else (b[-(aa-b.size):],b))
     r = b[a:] if a < 0 else b[:a]
-    return "".join(r) if j else r
+    return code_arr_to_str(r) if j else r
 
 
 def create_dyad_functions(klong):
@@ -0,0 +1,454 @@
+from .core import *
+import functools
+from .adverbs import get_adverb_chain_fn
+from .dyads import eval_dyad_at_index, eval_dyad_drop, eval_dyad_take
+from .monads import eval_monad_enumerate, eval_monad_groupby, group_sort
+
+
+def is_enumerate(x):
+    """
+    True if x is the parsed node for monadic !n.
+    """
+    return isinstance(x, KGFn) and x.is_op() and x.a.a == '!' and x.a.arity == 1
+
+
+def _is_count(n):
+    return is_integer(n) and n > 0
+
+
+def _over_sum(n):
+    return n*(n-1)//2
+
+
+def _over_max(n):
+    return n-1
+
+
+def _over_zero(n):
+    return 0
+
+
+def _scan_sum(n):
+    r = np.arange(n)
+    return r*(r+1)//2
+
+
+def _scan_zero(n):
+    return np.zeros(n, dtype=int)
+
+
+_fused_over = {'+': _over_sum, '|': _over_max, '&': _over_zero, '*': _over_zero}
+_fused_scan = {'+': _scan_sum, '|': np.arange, '&': _scan_zero}
+
+
+def _fuse_adverb(arr):
+    """
+    +/!n |/!n &/!n */!n +\\!n |\\!n &\\!n
+    """
+    if len(arr) != 3 or not is_enumerate(arr[2]) or not isinstance(arr[0].a, KGOp) or arr[1].arity != 1:
+        return None
+    fns = _fused_over if arr[1].a == '/' else _fused_scan if arr[1].a == '\\' else None
+    fn = fns.get(arr[0].a.a) if fns is not None else None
+    if fn is None:
+        return None
+    # a partial of module functions, rather than a closure, so the function body still pickles
+    return KGCall(KGLambda(functools.partial(_adverb, fn, arr)), [arr[2].args], arity=1)
+
+
+def _adverb(fn, arr, klong, x):
+    if _is_count(x):
+        return fn(int(x))
+    return get_adverb_chain_fn(klong, arr)(eval_monad_enumerate(x))
+
+
+def _at(klong, x, y):
+    """
+    (!x)@y
+    """
+    if _is_count(x):
+        if is_integer(y) and -x <= y < x:
+            return y+x if y < 0 else y
+        if isinstance(y, np.ndarray) and y.ndim == 1 and y.size > 0 and np.issubdtype(y.dtype, np.integer):
+            lo, hi = y.min(), y.max()
+            if -x <= lo and hi < x:
+                return np.where(y < 0, y+x, y) if lo < 0 else y.copy()
+    return eval_dyad_at_index(klong, eval_monad_enumerate(x), y)
+
+
+def _take(x, y):
+    """
+    x#!y
+    """
+    if _is_count(y) and is_integer(x) and abs(x) <= y:
+        return np.arange(x) if x >= 0 else np.arange(y+x, y)
+    return eval_dyad_take(x, eval_monad_enumerate(y))
+
+
+def _drop(x, y):
+    """
+    x_!y
+    """
+    if is_integer(y) and is_integer(x):
+        return np.arange(x, y) if x >= 0 else np.arange(0, y+x)
+    return eval_dyad_drop(x, eval_monad_enumerate(y))
+
+
+def _fuse_dyad(x):
+    op = x.a.a
+    a, b = x.args
+    if op == '@' and is_enumerate(a):
+        return KGCall(KGLambda(_at), [a.args, b], arity=2)
+    if op == '#' and is_enumerate(b):
+        return KGCall(KGLambda(_take), [a, b.args], arity=2)
+    if op == '_' and is_enumerate(b):
+        return KGCall(KGLambda(_drop), [a, b.args], arity=2)
+    return None
+
+
+def fuse_enumerate(x):
+    """
+
+    Return a fused replacement for the parsed node x if it consumes an
+    enumeration (!n) in a way that has a closed form, otherwise return x.
+
+    !n materializes np.arange(n), which is wasteful when the range is
+    immediately consumed, e.g.
+
+        +/!1000000000   -->  499999999500000000
+        (!n)@i          -->  i
+        k#!n            -->  np.arange(k)
+
+    The replacement calls a KGLambda which computes the result directly from
+    n.  Whenever the closed form does not apply (n or the other operand is not
+    an integer, the result would cycle, an index is out of range, ...) it falls
+    back to the original operation on the materialized range, so errors and
+    edge cases are unchanged.
+
+    """
+    if x.is_adverb_chain():
+        r = _fuse_adverb(x.a)
+    elif x.is_op() and x.a.arity == 2:
+        r = _fuse_dyad(x)
+    else:
+        r = None
+    return x if r is None else r
+
+
+def is_group(x):
+    """
+    True if x is the parsed node for monadic =a.
+    """
+    return isinstance(x, KGFn) and x.is_op() and x.a.a == '=' and x.a.arity == 1
+
+
+# per group reductions of t@x and the ufuncs computing them for all groups at once
+_group_reductions = {'+': 'add', '&': 'minimum', '|': 'maximum'}
+
+
+def _is_indexed_by_x(x):
+    """
+    Return t if x is t@x for a symbol t other than x, y and z, otherwise None.
+    """
+    if isinstance(x, KGFn) and x.is_op() and x.a.a == '@' and x.a.arity == 2:
+        t, i = x.args
+        if isinstance(i, KGSym) and i == reserved_fn_symbols[0] and isinstance(t, KGSym) and t not in reserved_fn_symbols:
+            return t
+    return None
+
+
+def _group_term(x):
+    """
+    Return ('count', None) if x is #x, ('count', t) if x is #t@x, (ufunc name, t) if x reduces
+    t@x (e.g. +/t@x), otherwise None.
+    """
+    if isinstance(x, KGFn) and x.is_op() and x.a.a == '#' and x.a.arity == 1:
+        if isinstance(x.args, KGSym) and x.args == reserved_fn_symbols[0]:
+            return 'count', None
+        t = _is_indexed_by_x(x.args)
+        if t is not None:
+            return 'count', t
+    elif isinstance(x, KGCall) and x.is_adverb_chain() and len(x.a) == 3:
+        v, o, t = x.a[0].a, x.a[1], _is_indexed_by_x(x.a[2])
+        if t is not None and isinstance(v, KGOp) and v.a in _group_reductions and o.a == '/' and o.arity == 1:
+            return _group_reductions[v.a], t
+    return None
+
+
+def _group_verb(v, arity):
+    """
+    Return (kind, t) if the verb v applied to each group is a count, a reduction or the mean (+/t@x)%#x.
+    """
+    if isinstance(v, KGOp):
+        return ('count', None) if v.a == '#' and arity == 1 else None
+    if not isinstance(v, KGFn) or isinstance(v, KGCall) or v.args is not None or v.arity != 1 or arity != 1:
+        return None
+    x = v.a
+    if isinstance(x, KGFn) and x.is_op() and x.a.a == '%' and x.a.arity == 2:
+        s, n = [_group_term(q) for q in x.args]
+        if s is not None and s[0] == 'add' and n is not None and n[0] == 'count' and n[1] in (None, s[1]):
+            return 'mean', s[1]
+        return None
+    return _group_term(x)
+
+
+def _group_reduce(kind, q, t):
+    """
+    Compute the verb described by kind for every group of q in a single pass, or return None if q or t are not supported.
+    t is None for #x, otherwise t@x must select from an array (of numbers, unless kind is a count).
+    """
+    q = str_to_code_arr(q) if isinstance(q, str) else np.asarray(q)
+    if q.ndim != 1 or len(q) == 0:
+        return None
+    if t is not None and not (np.isarray(t) and t.ndim >= 1 and len(t) >= len(q)):
+        return None
+    if kind != 'count' and not (t.ndim == 1 and t.dtype.kind in 'iuf'):
+        return None
+    a, s = group_sort(q)
+    starts = np.concatenate([[0], s])
+    if kind == 'count':
+        return np.diff(np.append(starts, len(q)))
+    v = t[a]
+    if kind in ('add', 'mean') and v.dtype.kind == 'f':
+        # +/ sums floats pairwise (np.add.reduce), which reduceat does not, so float groups
+        # are summed one by one to give the same results
+        r = np.asarray([np.add.reduce(p) for p in np.split(v, s)])
+    elif kind == 'mean':
+        r = np.add.reduceat(v, starts)
+    else:
+        return getattr(np, kind).reduceat(v, starts)
+    return np.divide(r, np.diff(np.append(starts, len(q)))) if kind == 'mean' else r
+
+
+def _fuse_group(arr):
+    """
+    f'=a where f is a count, a reduction of t@x or a mean (see _group_verb).
+    """
+    if len(arr) != 3 or arr[1].a != "'" or arr[1].arity != 1 or not is_group(arr[2]):
+        return None
+    g = _group_verb(arr[0].a, arr[0].arity)
+    if g is None:
+        return None
+    kind, t = g
+    return KGCall(KGLambda(functools.partial(_group, kind, t, arr)), [arr[2].args], arity=1)
+
+
+def _group(kind, t, arr, klong, x):
+    # t is looked up rather than evaluated, so an undefined t is not defined by the fused call
+    try:
+        y = None if t is None else klong._lookup(t)
+    except KeyError:
+        y = t
+    r = _group_reduce(kind, x, y)
+    return get_adverb_chain_fn(klong, arr)(eval_monad_groupby(x)) if r is None else r
+
+
+def fuse_groupby(x):
+    """
+
+    Return a fused replacement for the parsed node x if it applies a count, a sum,
+    a minimum, a maximum or a mean to each group of a group-by, otherwise return x:
+
+        #'=a  {#x}'=a  {+/t@x}'=a  {&/t@x}'=a  {|/t@x}'=a  {(+/t@x)%#x}'=a
+
+    Instead of calling the function once per group, the replacement sorts a once
+    and computes the results of all groups with ufunc.reduceat (float sums are summed
+    group by group, as +/ sums them pairwise).  It falls back to
+    the original expression if a is not a list or t is not a numeric vector.
+
+    """
+    if not x.is_adverb_chain():
+        return x
+    r = _fuse_group(x.a)
+    return x if r is None else r
+
+
+# atomic operators fused by fuse_elementwise, with their ufuncs
+_fused_dyads = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '%': np.divide,
+    '&': np.minimum,
+    '|': np.maximum,
+    '<': np.less,
+    '>': np.greater,
+    '=': np.equal,
+}
+_fused_monads = {'-': np.negative}
+
+# comparisons produce 0/1 integers (see kg_truth), which stay compact when they are only
+# compared, or combined with each other by & and |, and are widened before anything else
+# (as eval_dyad_minimum and eval_dyad_maximum do)
+_fused_truth = {'<', '>', '='}
+_fused_min_max = {'&', '|'}
+
+# number of elements evaluated per pass of a fused expression
+fuse_block_size = 1 << 13
+
+
+def _is_fusable_op(x):
+    if not isinstance(x, KGFn) or not x.is_op():
+        return False
+    return x.a.a in (_fused_dyads if x.a.arity == 2 else _fused_monads)
+
+
+def _is_fusable_value(x):
+    if isinstance(x, np.ndarray):
+        return x.dtype.kind in 'biuf'
+    return type(x) in (int, float) or (isinstance(x, np.number) and x.dtype.kind in 'biuf')
+
+
+class KGFused:
+    """
+
+    A tree of atomic operators (see fuse_elementwise) which is evaluated as a unit.
+
+    The leaves of the tree are the operands which are not atomic operators themselves.
+    They are evaluated in the order KlongInterpreter.eval would evaluate them and passed
+    to run().  The operators are kept as a program of (op, arity, operands) instructions
+    in evaluation order, where operands index the leaf values followed by the results of
+    the preceding instructions.
+
+    """
+    def __init__(self, expr):
+        self.expr = expr
+        self.leaves = []
+        prog = []
+        self._flatten(expr, prog)
+        n = len(self.leaves)
+        self.prog = [(op, arity, tuple(q if q >= 0 else n + ~q for q in operands)) for op, arity, operands in prog]
+
+    def _flatten(self, x, prog):
+        """
+        Returns the leaf index of x, or the bitwise complement of its instruction index.
+        """
+        if not _is_fusable_op(x):
+            self.leaves.append(x)
+            return len(self.leaves) - 1
+        if x.a.arity == 2:
+            b = self._flatten(x.args[1], prog)
+            operands = (self._flatten(x.args[0], prog), b)
+        else:
+            operands = (self._flatten(x.args, prog),)
+        prog.append((x.a.a, x.a.arity, operands))
+        return ~(len(prog) - 1)
+
+    def __str__(self):
+        return str(self.expr)
+
+    def run(self, klong, leaves):
+        """
+
+        Evaluate the expression given the values of its leaves.
+
+        When all leaves are numeric arrays of the same shape, or numbers, and the arrays
+        are larger than fuse_block_size, the expression is evaluated in blocks of
+        fuse_block_size elements.  Each instruction writes into a block sized buffer,
+        so the only full size array allocated is the result.  Otherwise the operators
+        are applied one by one as KlongInterpreter.eval would.
+
+        """
+        shape = None
+        for v in leaves:
+            if not _is_fusable_value(v):
+                shape = None
+                break
+            if isinstance(v, np.ndarray):
+                if shape is None:
+                    shape = v.shape
+                elif v.shape != shape:
+                    shape = None
+                    break
+        if shape is None or np.prod(shape) <= fuse_block_size:
+            return self._run(klong, list(leaves))
+        r = self._run_blocks(klong, list(leaves), shape)
+        return self._run(klong, list(leaves)) if r is None else r
+
+    def _run(self, klong, vals):
+        for op, arity, operands in self.prog:
+            f = klong._get_op_fn(op, arity)
+            vals.append(f(vals[operands[0]]) if arity == 1 else f(vals[operands[0]], vals[operands[1]]))
+        return vals[-1]
+
+    def _run_blocks(self, klong, vals, shape):
+        # instructions on scalars only are applied up front
+        is_arr = [isinstance(v, np.ndarray) for v in vals]
+        for i,v in enumerate(vals):
+            if is_arr[i]:
+                vals[i] = v.reshape(-1)
+        prog = []
+        for op, arity, operands in self.prog:
+            if any(is_arr[q] for q in operands):
+                prog.append((len(vals), op, operands))
+                vals.append(None)
+                is_arr.append(True)
+            else:
+                f = klong._get_op_fn(op, arity)
+                vals.append(f(vals[operands[0]]) if arity == 1 else f(vals[operands[0]], vals[operands[1]]))
+                is_arr.append(False)
+
+        # the result types of the ufuncs are found by running them on empty blocks
+        arrs = [i for i,v in enumerate(vals) if isinstance(v, np.ndarray)]
+        w = list(vals)
+        for i in arrs:
+            w[i] = vals[i][:0]
+        compact = {i for i in arrs if vals[i].dtype == np.uint8}
+        compact.update(i for i,v in enumerate(vals) if type(v) is np.uint8)
+        widen = set()
+        for j, op, operands in prog:
+            if len(operands) == 2 and op in _fused_truth:
+                compact.add(j)
+            elif len(operands) == 2 and op in _fused_min_max and all(q in compact for q in operands):
+                compact.add(j)
+            else:
+                widen.update(operands)
+        for i in widen:
+            if i < len(vals) and vals[i] is not None:
+                vals[i] = truth_to_int(vals[i])
+                w[i] = vals[i][:0] if i in arrs else vals[i]
+        dtypes = []
+        for j, op, operands in prog:
+            u = _fused_dyads[op] if len(operands) == 2 else _fused_monads[op]
+            try:
+                w[j] = u(*[w[q] for q in operands])
+            except Exception:
+                return None
+            if op in _fused_truth and len(operands) == 2:
+                w[j] = kg_truth(w[j])
+            if j in widen:
+                w[j] = truth_to_int(w[j])
+            if w[j].dtype.kind not in 'biuf':
+                return None
+            dtypes.append(w[j].dtype)
+
+        size = int(np.prod(shape))
+        out = np.empty(size, dtype=dtypes[-1])
+        bufs = [np.empty(fuse_block_size, dtype=t) for t in dtypes[:-1]]
+        for s in range(0, size, fuse_block_size):
+            e = min(s + fuse_block_size, size)
+            for i in arrs:
+                w[i] = vals[i][s:e]
+            for k, (j, op, operands) in enumerate(prog):
+                u = _fused_dyads[op] if len(operands) == 2 else _fused_monads[op]
+                w[j] = u(*[w[q] for q in operands], out=out[s:e] if k == len(prog) - 1 else bufs[k][:e-s])
+        return out.reshape(shape)
+
+
+def fuse_elementwise(x):
+    """
+
+    Return a KGFused for the parsed node x if it is a tree of at least two atomic
+    operators (+ - * % & | < > = and negate), otherwise return x.
+
+    An expression like 2*1+a evaluates every operator over the whole array, allocating
+    a temporary array for each intermediate result.  The fused expression instead runs
+    all operators over one cache sized block at a time (see KGFused.run).
+
+    """
+    if not _is_fusable_op(x):
+        return x
+    args = x.args if x.a.arity == 2 else [x.args]
+    args = [q.expr if isinstance(q, KGFused) else q for q in args]
+    if not any(_is_fusable_op(q) for q in args):
+        return x
+    return KGFused(KGFn(x.a, args if x.a.arity == 2 else args[0], x.arity))
@@ -1,36 +1,57 @@
+import copy
 import time
 from collections import deque
 
-from .adverbs import get_adverb_fn
+from .adverbs import chain_adverbs
+from .compiler import KlongCompiler, split_fn_locals
 from .core import *
 from .dyads import create_dyad_functions
+from .fusion import KGFused, fuse_elementwise, fuse_enumerate, fuse_groupby, is_enumerate
 from .monads import create_monad_functions
 from .sys_fn import create_system_functions
 from .sys_fn_ipc import create_system_functions_ipc, create_system_var_ipc
 from .sys_fn_timer import create_system_functions_timer
 from .sys_var import *
-from .utils import ReadonlyDict
-
-
-def set_context_var(d, sym, v):
-    """
-    Sets a context variable, wrapping Python lambda/functions as appropriate.
-    """
-    assert isinstance(sym, KGSym)
-    if callable(v) and not issubclass(type(v), KGLambda) :
-        x = KGLambda(v)
-        v = KGCall(x,args=None,arity=x.get_arity())
-    d[sym] = v
+from .utils import LRUCache, ReadonlyDict
 
 
 class KGModule(dict):
     """
     A module class that is used for optimizing when to scan for namespaced keys.
+
+    Namespaced keys (name`module) are indexed by their bare name so that unqualified
+    lookups do not have to scan every key in the module.
     """
     def __init__(self, name=None):
         self.name = name
+        self._index = {}
         super().__init__()
 
+    def __setitem__(self, k, v):
+        if k not in self and '`' in k:
+            self._index.setdefault(KGSym(k.split('`')[0]), []).append(k)
+        super().__setitem__(k, v)
+
+    def __delitem__(self, k):
+        super().__delitem__(k)
+        if '`' in k:
+            n = KGSym(k.split('`')[0])
+            q = self._index[n]
+            q.remove(k)
+            if len(q) == 0:
+                del self._index[n]
+
+    def get_namespaced(self, k):
+        """
+        Return the first namespaced key for the bare name k, or None.
+        """
+        q = self._index.get(k)
+        return q[0] if q else None
+
+
+# symbols which every function frame may bind, so lookups of them are never cached
+frame_arg_symbols = frozenset([*reserved_fn_symbols, reserved_dot_f_symbol])
+
 
 class KlongContext():
     """
@@ -55,43 +76,69 @@ class KlongContext():
     def __init__(self, system_contexts):
         self._context = deque([{}, *system_contexts])
         self._min_ctx_count = len(system_contexts)
+        self._global_count = len(self._context)
+        self.version = 0
 
     def start_module(self, name):
         self.push(KGModule(name))
         self._min_ctx_count = len(self._context)
+        self._global_count = len(self._context)
 
     def stop_module(self):
+        # the frame of the .module call is left in place of this context when the call
+        # returns, so either way one more context is global from here on
         self.push({})
+        self._global_count += 1
 
     def current_module(self):
         return self._module
 
+    def _global_level(self):
+        """
+        Index of the first context below the function frames (globals, modules and system).
+        """
+        return len(self._context) - self._global_count
+
     def __setitem__(self, k, v):
         assert isinstance(k, KGSym)
         if k not in reserved_fn_symbols:
-            for d in self._context:
+            for i,d in enumerate(self._context):
                 if in_map(k, d):
                     d[k] = v
+                    if i >= self._global_level():
+                        self.version += 1
                     return k
         set_context_var(self._context[0], k, v)
+        self.version += 1
         return k
 
     def __getitem__(self, k):
+        return self.lookup(k)[0]
+
+    def lookup(self, k):
+        """
+        Return the value of k and, if it may be cached until the version changes, the
+        (context, key) slot it was found in, else None.
+
+        Values found in function frames are never cacheable, as frames are written to
+        directly.  Any other slot stays valid until a define or delete, or until a frame
+        which may shadow it is pushed, each of which increment the version.
+        """
         assert isinstance(k, KGSym)
-        for d in self._context:
+        g = self._global_level()
+        for i,d in enumerate(self._context):
             v = d.get(k)
             if v is not None:
-                return v
+                return v, (d, k) if i >= g and k not in frame_arg_symbols else None
             if isinstance(d,KGModule):
                 if  '`' in k:
                     p = k.split('`')
                     if KGSym(p[1]) == d.name:
                         k = KGSym(p[0])
                 else:
-                    tk = k + '`'
-                    for dk in d.keys():
-                        if dk.startswith(tk):
-                            return d[dk]
+                    dk = d.get_namespaced(k)
+                    if dk is not None:
+                        return d[dk], (d, dk) if i >= g else None
         raise KeyError(k)
 
     def __delitem__(self, k):
@@ -99,11 +146,22 @@ class KlongContext():
         for d in self._context:
             if in_map(k, d) and not isinstance(d,ReadonlyDict):
                 del d[k]
+                self.version += 1
                 return
         raise KeyError(k)
 
     def push(self, d):
         self._context.appendleft(d)
+        if not frame_arg_symbols.issuperset(d):
+            self.version += 1
+
+    def update_frame(self, d):
+        """
+        Merge d into the innermost frame.
+        """
+        self._context[0].update(d)
+        if not frame_arg_symbols.issuperset(d):
+            self.version += 1
 
     def pop(self):
         return self._context.popleft() if len(self._context) > self._min_ctx_count else None
@@ -113,11 +171,8 @@ class KlongContext():
             for d in self._context:
                 if in_map(k, d):
                     return True
-                if isinstance(d,KGModule) and '`' not in k:
-                    tk = k + '`'
-                    for dk in d.keys():
-                        if dk.startswith(tk):
-                            return True
+                if isinstance(d,KGModule) and '`' not in k and d.get_namespaced(k) is not None:
+                    return True
         return False
     
     def __iter__(self):
@@ -157,65 +212,75 @@ def create_system_contexts():
     return [sys_var, ReadonlyDict(sys_d)]
 
 
-def chain_adverbs(klong, arr):
+def is_fold_literal(x):
     """
+    True if x is data which evaluates to itself and may be used as a folding operand.
+    """
+    return isinstance(x, (np.ndarray, int, float, np.number)) or (isinstance(x, str) and not isinstance(x, KGSym))
 
-        Multiple Adverbs
-
-        Multiple adverbs can be attached to a verb. In this case, the
-        first adverb modifies the verb, giving a new verb, and the next
-        adverb modifies the new verb. Note that subsequent adverbs must
-        be adverbs of monadic verbs, because the first verb-adverb
-        combination in a chain of adverbs forms a monad. So ,/' (Join-
-        Over-Each) would work, but ,/:' (Join-Over-Each-Pair) would not,
-        because :' expects a dyadic verb.
-
-        Examples:
 
-        +/' (Plus-Over-Each) would apply Plus-Over to each member of a
-        list:
+def copy_literals(x):
+    """
+    Return the parsed node x with its array literals (including folded constants) copied,
+    or x itself if it holds none.  Nodes without array literals are shared.
 
-        +/'[[1 2 3] [4 5 6] [7 8 9]]  -->  [6 15 24]
+    A cached program (see KlongInterpreter._parse) is run again for the same source, so
+    each run gets its own literals, which may then be changed through the results.
+    """
+    if isinstance(x, np.ndarray):
+        return copy.deepcopy(x) if x.dtype == object else x.copy()
+    if isinstance(x, list):
+        r = [copy_literals(q) for q in x]
+        return x if all(p is q for p,q in zip(r, x)) else type(x)(r)
+    if isinstance(x, KGFn):
+        a, args = copy_literals(x.a), copy_literals(x.args)
+        return x if a is x.a and args is x.args else type(x)(a, args, x.arity)
+    if isinstance(x, KGAdverb):
+        a = copy_literals(x.a)
+        return x if a is x.a else KGAdverb(a, x.arity)
+    if isinstance(x, KGFused):
+        e = copy_literals(x.expr)
+        return x if e is x.expr else KGFused(e)
+    return x
+
+
+# operators that are never folded: :: assigns and @ may apply a function
+unfoldable_ops = {'::', '@'}
+
+# larger literal enumerations are left to run time so that they may be fused (see fuse_enumerate)
+max_fold_enumerate = 1 << 16
 
-        ,/:~ (Flatten-Over-Converging) would apply Flatten-Over until a
-        fixpoint is reached:
 
-        ,/:~[1 [2 [3 [4] 5] 6] 7]  -->  [1 2 3 4 5 6 7]
+class KlongInterpreter():
 
-        ,/\~ (Flatten-Over-Scan-Converging) explains why ,/:~ flattens
-        any object:
+    def __init__(self, parse_cache_size=256, compiled=False, fold_constants=True, fuse_elementwise=False):
+        """
 
-        ,/\~[1 [2 [3 [4] 5] 6] 7]  -->  [[1 [2 [3 [4] 5] 6] 7]
-                                          [1 2 [3 [4] 5] 6 7]
-                                           [1 2 3 [4] 5 6 7]
-                                            [1 2 3 4 5 6 7]]
+        parse_cache_size: the maximum number of parsed programs retained by exec() so that
+                          repeated source strings skip parsing.  Use 0 to disable the cache.
 
-    """
-    if arr[0].arity == 1:
-        f = lambda x,k=klong,a=arr[0].a: k.eval(KGCall(a, [x], arity=1))
-    else:
-        f = lambda x,y,k=klong,a=arr[0].a: k.eval(KGCall(a, [x,y], arity=2))
-    for i in range(1,len(arr)-1):
-        o = get_adverb_fn(klong, arr[i].a, arity=arr[i].arity)
-        if arr[i].arity == 1:
-            f = lambda x,f=f,o=o: o(f,x,op=arr[0].a)
-        else:
-            f = lambda x,y,f=f,o=o: o(f,x,y)
-    if arr[-2].arity == 1:
-        f = lambda a=arr[-1],f=f,k=klong: f(k.eval(a))
-    else:
-        f = lambda a=arr[-1],f=f,k=klong: f(k.eval(a[0]),k.eval(a[1]))
-    return f
+        compiled: when True, programs are lowered into Python closures (see KlongCompiler)
+                  before they are run instead of being interpreted node by node.
 
+        fold_constants: when True, operators (and operator adverb chains) applied only to
+                        literals are evaluated once at parse time.  Disable when debugging
+                        to keep the parsed program as written.
 
-class KlongInterpreter():
+        fuse_elementwise: when True, expressions made of several atomic operators
+                          (+ - * % & | < > = and negate) are evaluated as a unit which
+                          works through large arrays block by block (see KGFused).
 
-    def __init__(self):
+        """
         self._context = KlongContext(create_system_contexts())
         self._vd = create_dyad_functions(self)
         self._vm = create_monad_functions(self)
         self._start_time = time.time()
         self._module = None
+        self._parse_cache = LRUCache(parse_cache_size) if parse_cache_size else None
+        self._compiler = KlongCompiler(self) if compiled else None
+        self._fn_syms = []
+        self._fold_constants = fold_constants
+        self._fuse_elementwise = fuse_elementwise
 
     def __setitem__(self, k, v):
         k = k if isinstance(k, KGSym) else KGSym(k)
@@ -230,6 +295,26 @@ class KlongInterpreter():
         k = k if isinstance(k, KGSym) else KGSym(k)
         del self._context[k]
 
+    def _lookup(self, x):
+        """
+
+        Look up the symbol x, using an inline cache kept on the symbol node.
+
+        The cache holds the context slot the value was found in, with the context version
+        it was looked up at, and is only filled for slots which KlongContext.lookup reports
+        as cacheable.  Holding the slot rather than the value keeps a replaced value from
+        being kept alive by the program.
+
+        """
+        ctx = self._context
+        c = getattr(x, '_kg_ic', None)
+        if c is not None and c[0] is ctx and c[1] == ctx.version:
+            return c[2][c[3]]
+        v, slot = ctx.lookup(x)
+        if slot is not None:
+            x._kg_ic = (ctx, ctx.version, *slot)
+        return v
+
     def _get_op_fn(self, s, arity):
         return self._vm[s] if arity == 1 else self._vd[s]
 
@@ -254,6 +339,45 @@ class KlongInterpreter():
     def process_start_time(self):
         return self._start_time
 
+    def _fold(self, x):
+        """
+
+        Constant folding: replace an operator, or an adverb chain over an operator, that is
+        applied only to literals by its value.  Nothing is folded if evaluation fails or does
+        not produce a literal, so errors are still raised when the program runs.
+
+        """
+        if not self._fold_constants:
+            return x
+        if x.is_op():
+            op = x.a.a
+            fa = x.args if x.a.arity == 2 else [x.args]
+        elif x.is_adverb_chain() and isinstance(x.a[0].a, KGOp):
+            op = x.a[0].a.a
+            fa = x.a[-1] if x.a[-2].arity == 2 else [x.a[-1]]
+        elif isinstance(x.a, KGLambda): # fused enumeration (see fuse_enumerate)
+            op = None
+            fa = x.args
+        else:
+            return x
+        if op in unfoldable_ops or not all(is_fold_literal(q) for q in fa):
+            return x
+        if is_enumerate(x) and is_integer(fa[0]) and fa[0] > max_fold_enumerate:
+            return x
+        try:
+            r = self.eval(x)
+        except Exception:
+            return x
+        return r if is_fold_literal(r) else x
+
+    def _optimize(self, x):
+        """
+        Rewrite a freshly parsed operator node: fuse enumerations and group-by reductions,
+        fold constants and then, if enabled, fuse atomic operators.
+        """
+        x = self._fold(fuse_groupby(fuse_enumerate(x)))
+        return fuse_elementwise(x) if self._fuse_elementwise else x
+
     def _apply_adverbs(self, t, i, a, aa, arity, dyad=False, dyad_value=None):
         aa_arity = get_adverb_arity(aa, arity)
         if isinstance(a,KGOp):
@@ -267,7 +391,7 @@ class KlongInterpreter():
             ii,aa = peek_adverb(t, i)
         i, aa = self._expr(t, i)
         arr.append([dyad_value,aa] if dyad else aa)
-        return i,KGCall(arr,args=None,arity=2 if dyad else 1)
+        return i,self._optimize(KGCall(arr,args=None,arity=2 if dyad else 1))
 
     def _read_fn_args(self, t, i=0):
         """
@@ -323,6 +447,33 @@ class KlongInterpreter():
         return i,arr
 
 
+    def _add_fn_sym(self, a):
+        if self._fn_syms and isinstance(a, KGSym) and in_map(a, reserved_fn_symbols):
+            self._fn_syms[-1].add(a)
+
+    def _read_fn(self, t, i=0):
+        """
+
+        Read a function body up to the closing brace and infer its arity.
+
+        The arity is the number of distinct x, y and z referenced in the body (not in
+        nested functions, which have their own) and is collected while the body is parsed.
+        When the body is a projection of a named function, e.g. {g(;1)}, its holes take
+        one more argument.
+
+        """
+        self._fn_syms.append(set())
+        try:
+            i,a = self.prog(t, i, ignore_newline=True)
+        finally:
+            syms = self._fn_syms.pop()
+        a = a[0] if len(a) == 1 else a
+        i = cexpect(t, i, '}')
+        arity = len(syms)
+        if isinstance(a,KGFn) and isinstance(a.a,KGSym) and not in_map(a.a,reserved_fn_symbols) and has_none(a.args):
+            arity += 1
+        return i, a, arity
+
     def _factor(self, t, i=0, ignore_newline=False):
         """
 
@@ -356,10 +507,7 @@ class KlongInterpreter():
         if a is None:
             return i,a
         if safe_eq(a, '{'): # read fn
-            i,a = self.prog(t, i, ignore_newline=True)
-            a = a[0] if len(a) == 1 else a
-            i = cexpect(t, i, '}')
-            arity = get_fn_arity(a)
+            i,a,arity = self._read_fn(t, i)
             if cmatch(t, i, '(') or cmatch2(t,i,':','('):
                 i,fa = self._read_fn_args(t,i)
                 a = KGFn(a, fa, arity) if has_none(fa) else KGCall(a, fa, arity)
@@ -369,6 +517,7 @@ class KlongInterpreter():
             if aa:
                 i,a = self._apply_adverbs(t, ii, a, aa, arity=1)
         elif isinstance(a, KGSym):
+            self._add_fn_sym(a)
             if cmatch(t,i,'(') or cmatch2(t,i,':','('):
                 i,fa = self._read_fn_args(t,i)
                 a = KGFn(a, fa, arity=len(fa)) if has_none(fa) else KGCall(a, fa, arity=len(fa))
@@ -387,7 +536,7 @@ class KlongInterpreter():
                 i,a = self._apply_adverbs(t, ii, a, aa, arity=1)
             else:
                 i, aa = self._expr(t, i, ignore_newline=ignore_newline)
-                a = KGFn(a, aa, arity=1)
+                a = self._optimize(KGFn(a, aa, arity=1))
         elif safe_eq(a, '('):
             i,a = self._expr(t, i, ignore_newline=ignore_newline)
             i = cexpect(t, i, ')')
@@ -413,11 +562,9 @@ class KlongInterpreter():
             aa.arity = 2
         while isinstance(aa,(KGOp,KGSym)) or safe_eq(aa, '{'):
             i = ii
+            self._add_fn_sym(aa)
             if safe_eq(aa, '{'): # read fn
-                i,aa = self.prog(t, i, ignore_newline=True)
-                aa = aa[0] if len(aa) == 1 else aa
-                i = cexpect(t, i, '}')
-                arity = get_fn_arity(aa)
+                i,aa,arity = self._read_fn(t, i)
                 if cmatch(t, i, '(') or cmatch2(t,i,':','('):
                     i,fa = self._read_fn_args(t,i)
                     aa = KGFn(aa, fa, arity=arity) if has_none(fa) else KGCall(aa, fa, arity=arity)
@@ -431,7 +578,7 @@ class KlongInterpreter():
                 i,a = self._apply_adverbs(t, ii, aa, aaa, arity=2, dyad=True, dyad_value=a)
             else:
                 i, aaa = self._expr(t, i, ignore_newline=ignore_newline)
-                a = KGFn(aa, [a, aaa], arity=2)
+                a = self._optimize(KGFn(aa, [a, aaa], arity=2))
             ii, aa = kg_read(t, i, ignore_newline=ignore_newline, module=self.current_module())
         return i, a
 
@@ -458,7 +605,7 @@ class KlongInterpreter():
             i = ii
         return i, arr
 
-    def _resolve_fn(self, f, f_args, f_arity):
+    def _resolve_fn(self, f, f_args, f_arity, deps=None):
         """
 
         Resolve a Klong function to its final form and update its arguments and arity.
@@ -473,6 +620,7 @@ class KlongInterpreter():
             f (KGFn or KGSym): The Klong function or symbol to resolve.
             f_args (list): The list of arguments currently being associated with the function for its evaluation.
             f_arity (int): The arity of the function.
+            deps (list): If provided, each symbol looked up is appended as (symbol, value) with value None if undefined.
 
         Returns:
             tuple: A tuple containing the resolved function, updated arguments list, and updated arity.
@@ -496,7 +644,9 @@ class KlongInterpreter():
         """
         if isinstance(f, KGSym):
             try:
-                _f = self._context[f]
+                _f = self._lookup(f)
+                if deps is not None:
+                    deps.append((f, _f))
                 if isinstance(_f, (KGFn,KGLambda)) or not in_map(f, reserved_fn_symbols):
                     # if f is a symbol and it resolves to a function, then we resolve f as the function.
                     # In this case, the f_args are meant for the resolved function.
@@ -506,6 +656,8 @@ class KlongInterpreter():
             except KeyError:
                 if not in_map(f, reserved_fn_symbols):
                     raise KlongException(f"undefined: {f}")
+                if deps is not None:
+                    deps.append((f, None))
         if f_arity > 0 and isinstance(f, KGFn) and not f.is_op() and not f.is_adverb_chain():
             if f.args is None:
                 # if f.args is None, then there are no projections in place and we use f_args entirely for the function.
@@ -515,6 +667,49 @@ class KlongInterpreter():
                 return f.a, f_args, f.arity
         return f, f_args, f_arity
 
+    def _resolve_call(self, x: KGFn):
+        """
+
+        Resolve the function and the (projection flattened) argument expressions of x.
+
+        The outcome only depends on x and on the values of the symbols looked up along
+        the way, so it is returned with those lookups as (deps, f, f_args, f_arity) and
+        cached on x.  deps is a list of (symbol, value) pairs, where value is None if the
+        symbol was undefined.  f is None if x does not supply enough arguments and is
+        itself a projection.
+
+        """
+        f = x.a
+        f_arity = x.arity
+        f_args = [None] if x.args is None else [x.args if isinstance(x.args, list) else [x.args]]
+        deps = []
+
+        # three passes as there are max three argumentes: x,y, and z
+        f, f_args, f_arity = self._resolve_fn(f, f_args, f_arity, deps)
+        f, f_args, f_arity = self._resolve_fn(f, f_args, f_arity, deps)
+        f, f_args, f_arity = self._resolve_fn(f, f_args, f_arity, deps)
+
+        f_args.reverse()
+        f_args = merge_projections(f_args)
+        if (0 if f_args is None else len(f_args)) < f_arity or has_none(f_args):
+            f = None
+        return deps, f, f_args, f_arity
+
+    def _is_resolved(self, deps):
+        """
+
+        Check that the symbols a cached resolution depends on still have the same values.
+
+        """
+        for k,v in deps:
+            try:
+                if self._lookup(k) is not v:
+                    return False
+            except KeyError:
+                if v is not None:
+                    return False
+        return True
+
     def _eval_fn(self, x: KGFn):
         """
 
@@ -541,6 +736,8 @@ class KlongInterpreter():
         * A new runtime context is prepared and the function is invoked.
         * Locals are populated with identity first in the local context.
         * The system var .f is populated in the local context and made available to the function.
+        * A function call in tail position of the body is run in a loop here instead of
+          recursing, so tail recursion is not limited by the Python stack.
 
         Notes:
 
@@ -548,40 +745,71 @@ class KlongInterpreter():
             Subsequent processing will then use the arguments attached to the referenced function as the basis for projection flattening.
 
         """
-        f = x.a
-        f_arity = x.arity
-        f_args = [None] if x.args is None else [x.args if isinstance(x.args, list) else [x.args]]
-
-        # three passes as there are max three argumentes: x,y, and z
-        f, f_args, f_arity = self._resolve_fn(f, f_args, f_arity)
-        f, f_args, f_arity = self._resolve_fn(f, f_args, f_arity)
-        f, f_args, f_arity = self._resolve_fn(f, f_args, f_arity)
+        frame = None
+        try:
+            while True:
+                r = getattr(x, '_kg_resolved', None)
+                if r is None or not self._is_resolved(r[0]):
+                    r = self._resolve_call(x)
+                    x._kg_resolved = r
+                _, f, f_args, f_arity = r
+                if f is None:
+                    return x
+                if frame is not None and issubclass(type(f), KGLambda):
+                    return self._eval_fn(x)
+
+                ctx = {} if f_args is None else {reserved_fn_symbol_map[p]: self.call(q) for p,q in zip(reserved_fn_args,f_args)}
+
+                if self._compiler is None:
+                    f_locals, f = split_fn_locals(f)
+                    fn = None
+                else:
+                    f_locals, f, fn = self._compiler.compile_fn(f)
+                for q in f_locals:
+                    ctx[q] = q
 
-        f_args.reverse()
-        f_args = merge_projections(f_args)
-        if (0 if f_args is None else len(f_args)) < f_arity or has_none(f_args):
-            return x
+                ctx[reserved_dot_f_symbol] = f
 
-        ctx = {} if f_args is None else {reserved_fn_symbol_map[p]: self.call(q) for p,q in zip(reserved_fn_args,f_args)}
+                if frame is None:
+                    frame = ctx
+                    self._context.push(frame)
+                else:
+                    # tail call: the callee's frame would shadow this one, which is
+                    # otherwise only visible to the callee, so the two are merged.
+                    self._context.update_frame(ctx)
+
+                if fn is not None:
+                    r = fn()
+                elif issubclass(type(f), KGLambda):
+                    return f(self, self._context)
+                else:
+                    r = self._call_body(f)
+                if not isinstance(r, KGTailCall):
+                    return r
+                x = r.x
+        finally:
+            if frame is not None:
+                self._context.pop()
 
-        if is_list(f) and len(f) > 1 and is_list(f[0]) and len(f[0]) > 0:
-            have_locals = True
-            for q in f[0]:
-                if not isinstance(q, KGSym):
-                    have_locals = False
-                    break
-            if have_locals:
-                for q in f[0]:
-                    ctx[q] = q
-                f = f[1:]
+    def _call_body(self, x):
+        """
 
-        ctx[reserved_dot_f_symbol] = f
+        Equivalent of call() for a function body, except that a function call in tail
+        position is returned as a KGTailCall to _eval_fn instead of being invoked.
 
-        self._context.push(ctx)
-        try:
-            return f(self, self._context) if issubclass(type(f), KGLambda) else self.call(f)
-        finally:
-            self._context.pop()
+        """
+        while True:
+            if isinstance(x, KGCond):
+                q = self.call(x[0])
+                x = x[2] if (is_number(q) and q == 0) or is_empty(q) else x[1]
+            elif isinstance(x, list) and len(x) > 0:
+                for y in x[:-1]:
+                    self.call(y)
+                x = x[-1]
+            elif isinstance(x, KGFn) and not x.is_op() and not x.is_adverb_chain():
+                return KGTailCall(x if isinstance(x, KGCall) else KGCall(x.a, x.args, x.arity))
+            else:
+                return self.call(x)
 
     def call(self, x):
         """
@@ -589,7 +817,11 @@ class KlongInterpreter():
         Invoke a Klong program (as produced by prog()), causing functions to be called and evaluated.
 
         """
-        return self.eval(KGCall(x.a, x.args, x.arity) if isinstance(x, KGFn) else x)
+        if self._compiler is not None:
+            return self._compiler.call(x)
+        if isinstance(x, KGFn) and not isinstance(x, KGCall) and not x.is_op() and not x.is_adverb_chain():
+            x = KGCall(x.a, x.args, x.arity)
+        return self.eval(x)
 
     def eval(self, x):
         """
@@ -604,7 +836,7 @@ class KlongInterpreter():
         """
         if isinstance(x, KGSym):
             try:
-                return self._context[x]
+                return self._lookup(x)
             except KeyError:
                 if x not in reserved_fn_symbols:
                     self._context[x] = x
@@ -617,9 +849,15 @@ class KlongInterpreter():
                 _x = fa[0] if x.a.a == '::' else self.eval(fa[0])
                 return f(_x) if x.a.arity == 1 else f(_x, _y)
             elif x.is_adverb_chain():
-                return chain_adverbs(self, x.a)()
+                c = getattr(x, '_kg_chain', None)
+                if c is None or c[0] is not self:
+                    c = (self, chain_adverbs(self, x.a))
+                    x._kg_chain = c
+                return c[1]()
             elif isinstance(x, KGCall):
                 return self._eval_fn(x)
+        elif isinstance(x, KGFused):
+            return x.run(self, [self.eval(q) for q in x.leaves])
         elif isinstance(x, KGCond):
             q = self.call(x[0])
             p = not ((is_number(q) and q == 0) or is_empty(q))
@@ -649,6 +887,38 @@ class KlongInterpreter():
         r = self.exec(x)
         return r[-1] if r else None
 
+    def _parse(self, x):
+        """
+
+        Parse a Klong program, reusing a previously parsed program for the same source text.
+
+        Parsing depends on the current parse module (symbols are qualified by it) and
+        may change it (via .module), so the module before parsing is part of the key and
+        the module after parsing is stored alongside the program and restored on a hit.
+        The statements holding array literals are handed out as copies (see copy_literals),
+        so the cached program is never changed through its results.
+
+        """
+        if self._parse_cache is None or not isinstance(x, str):
+            return self.prog(x)[1]
+        key = (x, self._module)
+        r = self._parse_cache.get(key)
+        if r is None:
+            prog = self.prog(x)[1]
+            r = (prog, self._module, [copy_literals(y) is not y for y in prog])
+            self._parse_cache[key] = r
+        else:
+            self._module = r[1]
+        return [copy_literals(y) if c else y for y,c in zip(r[0], r[2])]
+
+    def parse_cache_info(self):
+        """
+
+        Return the parse cache statistics (hits, misses, maxsize, currsize) or None if disabled.
+
+        """
+        return None if self._parse_cache is None else self._parse_cache.info()
+
     def exec(self, x):
         """
 
@@ -657,4 +927,4 @@ class KlongInterpreter():
         Each subprogram is executed in order and the resulting array contains the resulst of each sub-program.
 
         """
-        return [self.call(y) for y in self.prog(x)[1]]
+        return [self.call(y) for y in self._parse(x)]
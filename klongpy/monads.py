@@ -74,6 +74,11 @@ def eval_monad_expand_where(a):
                   &[0 1 0 1 0]  -->   [1 3]
 
     """
+    if np.isarray(a) and a.ndim == 1 and a.dtype.kind in 'iu':
+        # a list of truth values (see kg_truth) is a mask
+        if a.dtype == np.uint8 and (len(a) == 0 or a.max() <= 1):
+            return np.flatnonzero(a)
+        return np.repeat(np.arange(len(a)), a)
     return np.concatenate([np.zeros(x, dtype=int) + i for i,x in enumerate(a if is_list(a) else [a])])
 
 
@@ -114,7 +119,9 @@ def eval_monad_floor(a):
                   _1e100  -->  1.0e+100  :"if precision < 100 digits"
 
     """
-    return vec_fn(a, lambda x: np.floor(np.asarray(x, dtype=float)).astype(int))
+    f = lambda x: np.floor(np.asarray(x, dtype=float)).astype(int)
+    r = ragged_fn(a, f)
+    return vec_fn(a, f) if r is None else r
 
 
 def eval_monad_format(a):
@@ -163,7 +170,9 @@ def eval_monad_grade_up(a):
                     >[[1] [2] [3]]  -->  [2 1 0]
 
     """
-    return kg_argsort(str_to_chr_arr(a) if isinstance(a,str) else a)
+    if isinstance(a,str):
+        return np.argsort(str_to_code_arr(a), kind='stable')
+    return kg_argsort(a)
 
 
 def eval_monad_grade_down(a):
@@ -174,7 +183,9 @@ def eval_monad_grade_down(a):
         See [Grade-Up].
 
     """
-    return kg_argsort(str_to_chr_arr(a) if isinstance(a,str) else a, descending=True)
+    if isinstance(a,str):
+        return np.argsort(str_to_code_arr(a), kind='stable')[::-1]
+    return kg_argsort(a, descending=True)
 
 
 def eval_monad_groupby(a):
@@ -194,14 +205,29 @@ def eval_monad_groupby(a):
                   ="hello foo"  -->  [[0] [1] [2 3] [4 7 8] [5] [6]]
 
     """
-    q = np.asarray(str_to_chr_arr(a) if isinstance(a, str) else a)
-    if len(q) == 0:
-        return q
-    a = q.argsort()
-    r = np.split(a, np.where(q[a][1:] != q[a][:-1])[0] + 1)
+    if isinstance(a, str):
+        if len(a) == 0:
+            return np.asarray([], dtype=object)
+        q = str_to_code_arr(a)
+    else:
+        q = np.asarray(a)
+        if len(q) == 0:
+            return q
+    a, s = group_sort(q)
+    r = np.split(a, s)
     return np.asarray(r, dtype=object)
 
 
+def group_sort(q):
+    """
+    Return the indices which sort q and the positions in them where a new group of equal elements starts.
+    """
+    r = sym_ranks(q)
+    q = q if r is None else r
+    a = q.argsort(kind='stable')
+    return a, np.where(q[a][1:] != q[a][:-1])[0] + 1
+
+
 def eval_monad_list(a):
     """
 
@@ -234,7 +260,10 @@ def eval_monad_negate(a):
                   -1.23  -->  -1.23
 
     """
-    return vec_fn(a, lambda x: np.negative(kg_asarray(x)))
+    if type(a) in (int, float) and a != -2**63:
+        return -a
+    r = ragged_fn(a, np.negative)
+    return vec_fn(a, lambda x: np.negative(truth_to_int(kg_asarray(x)))) if r is None else r
 
 
 def eval_monad_not(a):
@@ -252,6 +281,8 @@ def eval_monad_not(a):
                   ~:foo  -->  0
 
     """
+    if np.isarray(a) and a.dtype.kind in 'biuf' and a.size > 0:
+        return kg_truth(np.logical_not(a))
     def _neg(x):
         return 1 if is_empty(x) else 0 if is_dict(x) or isinstance(x, (KGFn, KGSym)) else kg_truth(np.logical_not(np.asarray(x, dtype=object)))
     return vec_fn(a, _neg) if not is_empty(a) else _neg(a)
@@ -271,7 +302,7 @@ def eval_monad_range(a):
 
     """
     if isinstance(a, str):
-        return ''.join(np.unique(str_to_chr_arr(a)))
+        return code_arr_to_str(np.unique(str_to_code_arr(a)))
     elif np.isarray(a):
         if a.dtype != 'O' and a.ndim > 1:
             _,ids = np.unique(a,axis=0,return_index=True)
@@ -320,7 +351,9 @@ def eval_monad_reciprocal(a):
                    %0.1  -->  10.0
 
     """
-    return vec_fn(a, lambda x: np.reciprocal(np.asarray(x,dtype=float)))
+    f = lambda x: np.reciprocal(np.asarray(x,dtype=float))
+    r = ragged_fn(a, f)
+    return vec_fn(a, f) if r is None else r
 
 
 def eval_monad_reverse(a):
@@ -393,7 +426,12 @@ def eval_monad_shape(a):
     """
 
     def _a(x): # use numpy's natural shape by replacing all strings with arrays
-        return np.asarray([np.empty(len(y)) if isinstance(y,str) else (_a(y) if is_list(y) else y) for y in x])
+        try:
+            return np.asarray([np.empty(len(y)) if isinstance(y,str) else (_a(y) if is_list(y) else y) for y in x])
+        except ValueError: # a list of lists of unequal length is a vector
+            return np.empty(len(x))
+    if ragged(a) is not None:
+        return np.asarray([len(a)])
     return 0 if is_atom(a) else np.asarray([len(a)]) if isinstance(a,str) else np.asarray(_a(a).shape)
 
 
@@ -1,6 +1,9 @@
 import collections
 
 
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
 class ReadonlyDict(collections.abc.Mapping):
 
     def __init__(self, data):
@@ -33,3 +36,47 @@ class CallbackEvent:
     def trigger(self):
         for callback in self.subscribers:
             callback()
+
+
+class LRUCache:
+    """
+    A small bounded mapping that evicts the least recently used entry.
+
+    Hit and miss counters are kept so callers can report cache effectiveness
+    in the same form as functools.lru_cache.
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            v = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return v
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
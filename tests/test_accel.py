@@ -2,6 +2,7 @@ import unittest
 from klongpy import KlongInterpreter
 from utils import *
 from klongpy.backend import np
+from klongpy.core import truth_to_int
 import numpy
 
 
@@ -9,9 +10,11 @@ class Executed:
     def __init__(self, fn):
         self.fn = fn
         self.executed = False
+        self.count = 0
 
     def __call__(self, *args, **kwargs):
         self.executed = True
+        self.count += 1
         return self.fn(*args, **kwargs)
 
 
@@ -24,6 +27,16 @@ class ExecutedReduce:
         self.executed = True
         return self.fn.reduce(*args, **kwargs)
 
+    def accumulate(self, *args, **kwargs):
+        self.executed = True
+        return self.fn.accumulate(*args, **kwargs)
+
+    def __call__(self, *args, **kwargs):
+        return self.fn(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.fn, name)
+
 
 def get_rnd_nested_array():
     return np.asarray([np.random.rand(100), np.random.rand(100)])
@@ -224,4 +237,204 @@ class TestAccelerate(unittest.TestCase):
         self.assertTrue(kg_equal(r, [1,2,3]))
         self.assertTrue(e.executed)
 
+    ####### Scan / Neutral / Each-Pair
+
+    def test_scan_multiply(self):
+        klong = KlongInterpreter()
+        e = ExecutedReduce(np.multiply)
+        try:
+            np.multiply = e
+            r = klong('*\\[1 2 3 4]')
+        finally:
+            np.multiply = e.fn
+        self.assertTrue(kg_equal(r, [1, 2, 6, 24]))
+        self.assertTrue(e.executed)
+
+    def test_over_neutral_remainder(self):
+        klong = KlongInterpreter()
+        e = ExecutedReduce(np.fmod)
+        try:
+            np.fmod = e
+            r = klong('100!/[30 7]')
+        finally:
+            np.fmod = e.fn
+        self.assertEqual(r, 3)
+        self.assertTrue(e.executed)
+
+    def test_each_pair_subtract(self):
+        klong = KlongInterpreter()
+        e = Executed(np.subtract)
+        try:
+            np.subtract = e
+            r = klong("-:'[1 4 9 16]")
+        finally:
+            np.subtract = e.fn
+        self.assertTrue(kg_equal(r, [-3, -5, -7]))
+        self.assertEqual(e.count, 1)
+
+    def test_ufunc_folds_same_results(self):
+        klong = KlongInterpreter()
+        klong('a::[1 2 3 4];b::[0.5 -2 3 1];c::[[1 2] [3 4] [5 6]];d::[3 0 2 1 5];h::[1 1 0 1 0 0 1];p::[2 -1 3 2]')
+        for op in ['+', '-', '*', '%', '&', '|', '<', '>', '=', '^', '!']:
+            for v in ['a', 'b', 'c', 'd', 'h', 'p']:
+                for e in [f'{op}/{v}', f'{op}\\{v}', f"{op}:'{v}", f'2{op}/{v}', f'2{op}\\{v}', f'0.5{op}\\{v}']:
+                    # a function verb is folded in Python
+                    q = e.replace(op, '{x;x' + op + 'y}', 1)
+                    try:
+                        r = klong(e)
+                    except Exception:
+                        r = 'error'
+                    try:
+                        w = klong(q)
+                    except Exception:
+                        w = 'error'
+                    if isinstance(r, str) or isinstance(w, str):
+                        self.assertEqual(r, w, e)
+                        continue
+                    # vectorized comparisons keep their 0/1 results compact (see kg_truth)
+                    self.assertEqual(numpy.asarray(truth_to_int(r)).dtype, numpy.asarray(truth_to_int(w)).dtype, e)
+                    if numpy.asarray(r).dtype == object:
+                        self.assertTrue(kg_equal(r, w), e)
+                    else:
+                        self.assertTrue(numpy.allclose(r, w, equal_nan=True), e)
+
+    def test_ufunc_folds_exact(self):
+        """
+        Folds which the ufuncs can't do exactly (power with negative exponents) give the
+        same values as the dyad applied step by step, and single element scans keep their type.
+        """
+        klong = KlongInterpreter()
+        for e, q in [('^/[3 -2 -2]', '{x^y}/[3 -2 -2]'), ('3^/[-2 -2]', '3{x^y}/[-2 -2]'),
+                     ('^\\[3 -2 -2]', '{x^y}\\[3 -2 -2]'), ('3^\\[-2 -2]', '3{x^y}\\[-2 -2]'),
+                     ('^/[3 2 2]', '{x^y}/[3 2 2]'), ('^\\[3 2 2]', '{x^y}\\[3 2 2]'),
+                     ('^/[2 0.5 4]', '{x^y}/[2 0.5 4]'), ('^/[3 40 2]', '{x^y}/[3 40 2]')]:
+            r, w = klong(e), klong(q)
+            self.assertEqual(numpy.asarray(r).dtype, numpy.asarray(w).dtype, e)
+            self.assertTrue(numpy.array_equal(r, w), e)
+        for op in ['+', '-', '*', '%', '&', '|', '^']:
+            r = klong(f'{op}\\[4]')
+            self.assertEqual(r.dtype, int, op)
+            self.assertTrue(kg_equal(r, [4]), op)
+
+    ####### Each
+
+    def test_each_negate(self):
+        klong = KlongInterpreter()
+        e = Executed(np.negative)
+        data = get_rnd_array()
+        try:
+            np.negative = e
+            klong['data'] = data
+            r = klong("-'data")
+        finally:
+            np.negative = e.fn
+        self.assertTrue(kg_equal(r, -data))
+        self.assertEqual(e.count, 1)
 
+    def test_each_lambda(self):
+        klong = KlongInterpreter()
+        e = Executed(np.multiply)
+        data = get_rnd_nested_array()
+        try:
+            np.multiply = e
+            klong['data'] = data
+            r = klong("{x*x+1}'data")
+        finally:
+            np.multiply = e.fn
+        self.assertTrue(kg_equal(r, data*(data+1)))
+        self.assertEqual(e.count, 1)
+
+    def test_each_vectorized_same_results(self):
+        klong = KlongInterpreter()
+        klong('a::[1 2 3 4];b::[0.5 -2 3];c::[[1 2] [3 4]]')
+        # a function body with several expressions is not vectorized
+        for e, q in [("-'a", "{x;-x}'a"), ("-'c", "{x;-x}'c"), ("{x*x+1}'a", "{x;x*x+1}'a"),
+                     ("{-x%2}'c", "{x;-x%2}'c"), ("a+'b", "a{x;x+y}'b"), ("b<'a", "b{x;x<y}'a"),
+                     ("a='a", "a{x;x=y}'a"), ("c*'c", "c{x;x*y}'c"), ("a%'[1 0 3 4]", "a{x;x%y}'[1 0 3 4]"),
+                     ("2%:\\a", "2{x;x%y}:\\a"), ("2%:/a", "2{x;x%y}:/a"), ("1.5-:\\c", "1.5{x;x-y}:\\c"),
+                     ("a{x-y}'b", "a{x;x-y}'b"), ("-'[]", "{x;-x}'[]")]:
+            r = klong(e)
+            self.assertTrue(kg_equal(r, klong(q)), e)
+            self.assertEqual(truth_to_int(r).dtype, truth_to_int(klong(q)).dtype, e)
+
+    def test_ragged_negate(self):
+        klong = KlongInterpreter()
+        e = Executed(np.negative)
+        data = np.asarray([np.arange(3), np.arange(5), np.arange(1)], dtype=object)
+        try:
+            np.negative = e
+            klong['data'] = data
+            r = klong("-data")
+        finally:
+            np.negative = e.fn
+        self.assertTrue(kg_equal(r, [-x for x in data]))
+        self.assertEqual(e.count, 1)
+
+    def test_each_over_ragged(self):
+        klong = KlongInterpreter()
+        e = ExecutedReduce(np.add)
+        data = np.asarray([np.arange(3), np.arange(5), np.arange(1)], dtype=object)
+        try:
+            np.add = e
+            klong['data'] = data
+            r = klong("+/'data")
+        finally:
+            np.add = e.fn
+        self.assertTrue(kg_equal(r, [3, 10, 0]))
+        self.assertFalse(e.executed)
+
+    def test_typed_compare(self):
+        import klongpy.dyads
+        klong = KlongInterpreter()
+        klong('s::["b" "a" "c"];y::[:b :a :c]')
+        klong['x'] = np.arange(10)
+        e = Executed(klongpy.dyads.vec_fn2)
+        try:
+            klongpy.dyads.vec_fn2 = e
+            r = [klong(q) for q in ['x=5', 'x>7', '3<x', 'x<1.0*x', 's="a"', 's<"b"', '"b">s', 's<s', 'y<:b', 'y>y']]
+        finally:
+            klongpy.dyads.vec_fn2 = e.fn
+        self.assertFalse(e.executed)
+        for q, a in zip(r, ['[0 0 0 0 0 1 0 0 0 0]', '[0 0 0 0 0 0 0 0 1 1]', '[0 0 0 0 1 1 1 1 1 1]', '&10',
+                            '[0 1 0]', '[0 1 0]', '[0 1 0]', '[0 0 0]', '[0 1 0]', '[0 0 0]']):
+            self.assertTrue(kg_equal(q, klong(a)), a)
+
+    def test_where_mask(self):
+        klong = KlongInterpreter()
+        e = Executed(np.flatnonzero)
+        klong['x'] = np.arange(10)
+        try:
+            np.flatnonzero = e
+            r = klong('&(x>2)&x<6')
+        finally:
+            np.flatnonzero = e.fn
+        self.assertTrue(kg_equal(r, [3, 4, 5]))
+        self.assertEqual(e.count, 1)
+        self.assertEqual(klong('x>2').dtype, numpy.uint8)
+
+    def test_truth_arithmetic_dtypes(self):
+        # small arrays are evaluated op by op, large ones in fused blocks
+        for n in [3, 20000]:
+            klong = KlongInterpreter(fuse_elementwise=True)
+            klong['a'] = np.arange(1, n+1)
+            klong('x::a>1')
+            for e in ['x*300', 'x*-1', 'x|300', 'x&-1', '(x*200)*2', '((a>1)*100)*100', '((a>1)&a>2)*300',
+                      'x:=300,0', 'x!-5', 'x^9']:
+                r = klong(e)
+                self.assertEqual(r.dtype, int, (n, e))
+                self.assertTrue(kg_equal(r, klong(e.replace('x', '(1*a>1)'))), (n, e))
+            self.assertTrue(kg_equal(klong('((a>1)*100)*100')[:2], [0, 10000]))
+            for e in ['x|x', '(a>1)&a>2', 'x&a<3']:
+                self.assertEqual(klong(e).dtype, numpy.uint8, (n, e))
+
+    def test_ragged_same_results(self):
+        klong = KlongInterpreter()
+        klong('j::[[1 2 3] [4] [5 6]];f::[[1.5 -2] [3]];m::[[1 2] [3 4]]')
+        # a function body with several expressions is applied to each element
+        for e, q in [("j+1", "{x;x+1}'j"), ("[10 20 30]-j", "[[9 8 7] [16] [25 24]]"), ("j*j", "[[1 4 9] [16] [25 36]]"),
+                     ("j%2", "{x;x%2}'j"), ("j|2", "{x;x|2}'j"), ("2&j", "{x;2&x}'j"), ("j<2", "{x;x<2}'j"),
+                     ("j>2", "{x;x>2}'j"), ("j=4", "{x;x=4}'j"), ("-f", "{x;-x}'f"), ("_f", "{x;_x}'f"),
+                     ("{x*x+1}'j", "{x;x*x+1}'j"), ("j{x-y}'j", "j-j"), ("2-:\\j", "2-j"), ("2-:/j", "j-2"),
+                     ("+/'j", "{x;+/x}'j"), ("*/'j", "{x;*/x}'j"), ("&/'f", "{x;&/x}'f"),
+                     ("|/'m", "{x;|/x}'m"), ("+/'m", "{x;+/x}'m"), ("^j", ",3")]:
+            self.assertTrue(kg_equal(klong(e), klong(q)), e)
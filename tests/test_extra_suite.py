@@ -44,6 +44,33 @@ class TestExtraCoreSuite(unittest.TestCase):
         with self.assertRaises(KeyError):
             klong("D@2")
 
+    def test_dict_literal_values_copied(self):
+        klong = KlongInterpreter()
+        src = ':{[1 [1 2 3]] [2 [[1 2] 3]] [3 "ab"]}'
+        for _ in range(2):
+            r = klong(src)
+            self.assertEqual(r[1], [1, 2, 3])
+            self.assertEqual(r[2], [[1, 2], 3])
+            r[1][0] = 99
+            r[2][0][0] = 99
+        klong('f::{:{[1 [1 2 3]]}}')
+        r = klong('f()')
+        r[1][0] = 99
+        self.assertEqual(klong('f()')[1], [1, 2, 3])
+
+    def test_scalar_int64_overflow(self):
+        klong = KlongInterpreter()
+        klong('a::9223372036854775807')
+        with np.errstate(over='ignore'):
+            self.assertEqual(klong('a+1'), -9223372036854775808)
+            self.assertEqual(klong('a*a'), 1)
+            self.assertEqual(klong('(-a)-2'), 9223372036854775807)
+            self.assertEqual(klong('-(-a)-1'), -9223372036854775808)
+            self.assertTrue(kg_equal(klong('(a+1)+[1 2]'), np.array([-9223372036854775807, -9223372036854775806])))
+            self.assertTrue(kg_equal(klong('[1]*a*a*a'), klong('[1]*a*[1]*a*a')))
+            self.assertEqual(klong('[1]*a*a*a').dtype, np.int64)
+        self.assertEqual(klong('2*3'), 6)
+
     def test_each_dict_with_mixed_types(self):
         klong = KlongInterpreter()
         klong["D"] = {object: [1, 2, 3]}
@@ -380,3 +407,84 @@ zop([
         self.assertTrue(np.isclose(r,1.41421356237309504))
         r = klong('s()')
         self.assertTrue(np.isclose(r,1.41421356237309504))
+
+    def test_reshape_string_matrix(self):
+        self.assert_eval_cmp('[2 3]:^"abcdef"', '["abc" "def"]')
+        self.assert_eval_cmp('[2 2]:^"abcdef"', '["ab" "cd"]')
+        self.assert_eval_cmp('[2 4]:^"ab"', '["abab" "abab"]')
+        klong = KlongInterpreter()
+        for e in ['[2 3]:^"abcdef"', '[2 3 5]:_"abcdef"']:
+            r = klong(e)
+            self.assertEqual(r.dtype, object)
+            self.assertTrue(all(type(x) is str for x in r))
+        self.assertEqual(klong('a::[2 3]:^"abcdef";a@0'), "abc")
+        self.assertEqual(klong('a=["abc" "xyz"]').tolist(), [1, 0])
+
+    def test_string_ops_unicode(self):
+        klong = KlongInterpreter()
+        klong['s'] = "héllo wörld 😀"
+        self.assertEqual(klong('3#s'), "hél")
+        self.assertEqual(klong('(-3)#s'), "d 😀")
+        self.assertEqual(klong('1:+s'), "😀héllo wörld ")
+        self.assertEqual(klong('s@[1 7 12]'), "éö😀")
+        self.assertTrue(kg_equal(klong('[2 6]:_s'), ["hé", "llo ", "wörld 😀"]))
+        self.assertTrue(kg_equal(klong('[6 1]:#s'), ["héllo ", "w", "örld 😀"]))
+        self.assertEqual(klong('s:="ÄÖ",[0 6]'), "ÄÖllo ÄÖrld 😀")
+        self.assertEqual(klong('?"😀aéa😀"'), "aé😀")
+        self.assertTrue(kg_equal(klong('<"bé😀ab"'), [3, 0, 4, 1, 2]))
+        self.assertTrue(kg_equal(klong('>"bé😀ab"'), [2, 1, 4, 0, 3]))
+        self.assertTrue(kg_equal(klong('="é😀é"'), [[0, 2], [1]]))
+
+    def test_symbol_arrays(self):
+        self.assert_eval_cmp('[:b :a :c :a]=:a', '[0 1 0 1]')
+        self.assert_eval_cmp(':a=[:b :a :c :a]', '[0 1 0 1]')
+        self.assert_eval_cmp('[:b :a :c]=[:b :c :c]', '[1 0 1]')
+        self.assert_eval_cmp('[:b :a :c :a]?:a', '[1 3]')
+        self.assert_eval_cmp('[:b 1 :a]?:a', '[2]')
+        self.assert_eval_cmp('[:b :a]~[:b :a]', '1')
+        self.assert_eval_cmp('[:b :a]~[:b :c]', '0')
+        self.assert_eval_cmp('<[:b :a :c :a]', '[1 3 0 2]')
+        self.assert_eval_cmp('>[:b :a :c :a]', '[2 0 3 1]')
+        self.assert_eval_cmp('=[:b :a :c :a :b]', '[[1 3] [0 4] [2]]')
+
+    def test_compare_lists(self):
+        self.assert_eval_cmp('["a" "bb" "c"]<"bb"', '[1 0 0]')
+        self.assert_eval_cmp('"bb">["a" "bb" "c"]', '[1 0 0]')
+        self.assert_eval_cmp('["a" "bb" "c"]=["a" "b" "c"]', '[1 0 1]')
+        self.assert_eval_cmp('[:a :b :c]<:b', '[1 0 0]')
+        self.assert_eval_cmp('[:a "a"]=["a" "a"]', '[0 1]')
+        self.assert_eval_cmp('[1 2 3]<[1.5 2 3]', '[1 0 0]')
+        self.assert_eval_cmp('[1 :a "x"]=:a', '[0 1 0]')
+        self.assert_eval_cmp('[1 2 3]~[1.0 2.0 3.0]', '1')
+        self.assert_eval_cmp('[1 2 3]~[1.0 2.5 3.0]', '0')
+        self.assert_eval_cmp('[[1 2] [3 4]]~[1.0 2.0]', '0')
+        self.assert_eval_cmp('["a" "b"]~["a" "b"]', '1')
+        self.assert_eval_cmp('[:a "a"]~["a" "a"]', '0')
+
+    def test_truth_arrays(self):
+        self.assert_eval_cmp('([1 2 3]<2)-1', '[0 -1 -1]')
+        self.assert_eval_cmp('-[1 2 3]<2', '[-1 0 0]')
+        self.assert_eval_cmp('([1 2 3]<3)+255', '[256 256 255]')
+        self.assert_eval_cmp('+\\[1 2 3]<3', '[1 2 2]')
+        self.assert_eval_cmp('-/[1 2 3]>1', '-2')
+        self.assert_eval_cmp('&[1 2 3]>1', '[1 2]')
+        self.assert_eval_cmp('&[1 2 0]', '[0 1 1]')
+        self.assert_eval_cmp('~[1 0 2]', '[0 1 0]')
+        self.assert_eval_cmp('[10 20 30]@[1 2 3]<3', '[20 20 10]')
+        self.assert_eval_cmp('([1 2 3]<2)~[1 0 0]', '1')
+        self.assert_eval_cmp('(([1 2 3]>1)*200)*2', '[0 400 400]')
+        self.assert_eval_cmp('(([1 2 3]>1)*100)*100', '[0 10000 10000]')
+        self.assert_eval_cmp('([1 2 3]>1):=300,0', '[300 1 1]')
+        self.assert_eval_cmp('([1 2 3]>1):-300,[0]', '[300 1 1]')
+        self.assert_eval_cmp('([1 2 3]>1)|300', '[300 300 300]')
+        self.assert_eval_cmp('([1 2 3]>1)&-1', '[-1 -1 -1]')
+        self.assert_eval_cmp('([1 2 3]>1)!-5', '[0 1 1]')
+        self.assert_eval_cmp('([1 2 3]>1)^9', '[0 1 1]')
+        self.assert_eval_cmp('(+\\[5]>9)-1', '[-1]')
+        self.assert_eval_cmp('(*\\[5]>9)-1', '[-1]')
+        self.assert_eval_cmp('(+/[5]>9)-1', '-1')
+
+    def test_shape_jagged(self):
+        self.assert_eval_cmp('^[1 [2]]', '[2]')
+        self.assert_eval_cmp('^[[1 2] [3]]', '[2]')
+        self.assert_eval_cmp('^[[[1 2] [3]] [[1 2] [3]]]', '[2 2]')
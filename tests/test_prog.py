@@ -1,6 +1,9 @@
+import pickle
 import unittest
+from unittest.mock import patch
 from klongpy import KlongInterpreter
-from klongpy.core import KGSym, read_sys_comment
+from klongpy.core import KGFn, KGLambda, KGSym, KlongException, read_sys_comment
+from klongpy.fusion import KGFused
 from utils import *
 
 class TestProg(unittest.TestCase):
@@ -105,3 +108,280 @@ lin2(1)
         cmd = '.comment("*****")'
         i = read_sys_comment(t, t.index(cmd)+len(cmd), "*****")
         assert i == x
+
+    def test_parse_cache_hit(self):
+        klong = KlongInterpreter()
+        klong("a::1")
+        self.assertEqual(klong("a+1"), 2)
+        klong("a::2")
+        self.assertEqual(klong("a+1"), 3)
+        info = klong.parse_cache_info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 3)
+
+    def test_parse_cache_eviction(self):
+        klong = KlongInterpreter(parse_cache_size=2)
+        klong("1+1")
+        klong("1+2")
+        klong("1+3")
+        info = klong.parse_cache_info()
+        self.assertEqual(info.currsize, 2)
+        self.assertEqual(klong("1+1"), 2)
+        self.assertEqual(klong.parse_cache_info().hits, 0)
+
+    def test_parse_cache_disabled(self):
+        klong = KlongInterpreter(parse_cache_size=0)
+        self.assertEqual(klong("1+1"), 2)
+        self.assertIsNone(klong.parse_cache_info())
+
+    def test_parse_cache_literal_mutation(self):
+        """
+        Changing a result in Python must not change the literals of the cached program.
+        """
+        klong = KlongInterpreter()
+        for src, expected in [("[1 2 3]", [1,2,3]), ("1+[1 2 3]", [2,3,4]), ("!3", [0,1,2]), ("x::[1 2 3]", [1,2,3])]:
+            r = klong(src)
+            r[0] = 99
+            self.assertTrue(kg_equal(klong(src), np.array(expected)), src)
+        r = klong("[1 [2 3]]")
+        r[1][0] = 99
+        self.assertTrue(kg_equal(klong("[1 [2 3]]"), np.array([1, np.array([2,3])], dtype=object)))
+        self.assertEqual(klong.parse_cache_info().misses, 5)
+        # literals are not read-only, so Python functions may change their arguments
+        klong['s'] = lambda x: (x.sort(), x)[1]
+        for _ in range(2):
+            self.assertTrue(kg_equal(klong('s([3 1 2])'), np.array([1,2,3])))
+            self.assertTrue(kg_equal(klong('{s([3 1 2])}()'), np.array([1,2,3])))
+        self.assertTrue(kg_equal(klong('[3 1 2]'), np.array([3,1,2])))
+
+    def test_parse_cache_module(self):
+        """
+        The same source parsed under different modules must not share a cached program.
+        """
+        klong = KlongInterpreter()
+        klong['v'] = 1
+        klong('.module(:foo)')
+        klong('a::v')
+        klong('.module(0)')
+        klong['v'] = 2
+        klong('.module(:bar)')
+        klong('a::v')
+        klong('.module(0)')
+        self.assertEqual(klong['a`foo'], 1)
+        self.assertEqual(klong['a`bar'], 2)
+
+    def test_resolved_call_redefined(self):
+        """
+        A call node caches its resolved function, which must follow redefinitions.
+        """
+        klong = KlongInterpreter()
+        klong('f::{x+1}')
+        p = klong.prog('f(1)')[1][0]
+        self.assertEqual(klong.call(p), 2)
+        klong('f::{x+2}')
+        self.assertEqual(klong.call(p), 3)
+        klong('f::{x*y}(;10)')
+        self.assertEqual(klong.call(p), 10)
+        self.assertEqual(klong('g::{x(2)};g({x+1})'), 3)
+        self.assertEqual(klong('g({x*3})'), 6)
+
+    def test_cached_lookup_module(self):
+        """
+        Global lookups stay cached once a module has been defined, and while one is open.
+        """
+        klong = KlongInterpreter()
+        klong('g::10')
+        klong('.module(:m)')
+        klong('h::{x+1}')
+        klong('.module(0)')
+        klong('f::{g+x}')
+        for module in [None, ':n']:
+            if module is not None:
+                klong(f'.module({module})')
+            self.assertEqual(klong('f(1)'), 11)
+            with patch.object(klong._context, 'lookup', wraps=klong._context.lookup) as p:
+                self.assertEqual(klong('f(2)'), 12)
+                self.assertEqual(klong('f(3)'), 13)
+            looked_up = [c.args[0] for c in p.call_args_list]
+            self.assertNotIn(KGSym('g'), looked_up)
+            self.assertEqual(looked_up.count(KGSym('x')), 2)
+        klong('.module(0)')
+        klong('g::20')
+        self.assertEqual(klong('f(1)'), 21)
+
+    def test_cached_lookup_module_frames(self):
+        """
+        Values in function frames are not cached while a module is open.
+        """
+        klong = KlongInterpreter()
+        klong('.module(:m)')
+        klong('g::{a}')
+        klong('f::{[a];a::x;g()}')
+        self.assertEqual(klong('f(5)'), 5)
+        with self.assertRaises(KlongException):
+            klong('g()')
+
+    def test_cached_nodes_pickle(self):
+        """
+        Parsed nodes are also values, so the caches kept on them must not be pickled.
+        """
+        for klong in [KlongInterpreter(), KlongInterpreter(compiled=True)]:
+            klong('foo')
+            klong('foo')
+            self.assertEqual(pickle.loads(pickle.dumps(klong['foo'])), KGSym('foo'))
+            klong("f::{x+1};g::{:[x;f(x);+/'[[1 2] [3 4]]]}")
+            klong('g(1);g(1);g(0);g(0)')
+            g = pickle.loads(pickle.dumps(klong._context[KGSym('g')]))
+            self.assertFalse([k for k in vars(g) if k.startswith(('_kg_', '_kc_'))])
+            klong['h'] = g
+            self.assertEqual(klong('h(1)'), 2)
+            self.assertTrue(kg_equal(klong('h(0)'), [3, 7]))
+
+    def test_adverb_chain_reused(self):
+        klong = KlongInterpreter()
+        klong('f::{x+1}')
+        p = klong.prog("f'[1 2]")[1][0]
+        self.assertTrue(kg_equal(klong.call(p), [2, 3]))
+        c = p._kg_chain
+        klong('f::{x*10}')
+        self.assertTrue(kg_equal(klong.call(p), [10, 20]))
+        self.assertIs(p._kg_chain, c)
+        self.assertTrue(kg_equal(klong("+/'[[1 2] [3 4]]"), [3, 7]))
+
+    def test_fn_arity(self):
+        klong = KlongInterpreter()
+        for p,arity in [('{1}', 0), ('{-x}', 1), ('{x+y}', 2), ('{:[x;y;z]}', 3), ("{x'y}", 2), ('{{x+y}}', 0), ('{y}', 1)]:
+            self.assertEqual(klong.prog(p)[1][0].arity, arity, msg=p)
+
+    def test_fold_constants(self):
+        klong = KlongInterpreter()
+        p = klong.prog('2*1+!3')[1]
+        self.assertTrue(kg_equal(p[0], [2, 4, 6]))
+        self.assertEqual(klong.prog('+/!10')[1][0], 45)
+        self.assertEqual(klong.prog('x+3*4')[1][0].args[1], 12)
+        self.assertEqual(klong.prog('a::1+2')[1][0].args, [KGSym('a'), 3])
+        self.assertTrue(isinstance(klong.prog('1+a')[1][0], KGFn))
+        self.assertTrue(isinstance(klong.prog('1+"a"')[1][0], KGFn))
+        p = KlongInterpreter(fold_constants=False).prog('2*1+!3')[1]
+        self.assertTrue(isinstance(p[0], KGFn))
+        self.assertEqual(klong('{x+3*4}(1)'), 13)
+
+    def test_fuse_elementwise(self):
+        klong = KlongInterpreter(fuse_elementwise=True)
+        self.assertTrue(isinstance(klong.prog('2*1+a')[1][0], KGFused))
+        self.assertTrue(isinstance(klong.prog('1+a')[1][0], KGFn))
+        exprs = ['2*1+a', '(a*b)+(a-b)%(b+1)', '-(a+1)*2', '(a<b)+(a>3)', '(a=5)*b',
+                 '(a&b)|3', '(a*2)+(1+1)*(-3)', 'a+b+[1 2]', '1+a+"x"', 'c::(1+a)*b;c']
+        for n in [10, 20001]:
+            for m in [7, 2.5]:
+                src = f'a::!{n};b::(!{n})%{m}'
+                klong(src)
+                ref = KlongInterpreter(compiled=True)
+                ref(src)
+                for e in exprs:
+                    try:
+                        r = klong(e)
+                    except Exception:
+                        r = 'error'
+                    try:
+                        q = ref(e)
+                    except Exception:
+                        q = 'error'
+                    self.assertTrue(kg_equal(r, q), f'{e} n={n} m={m}')
+                    self.assertEqual(getattr(r, 'dtype', None), getattr(q, 'dtype', None))
+        klong = KlongInterpreter(fuse_elementwise=True, compiled=True)
+        klong('f::{(2*x)+(y-1)*3%x+1}')
+        self.assertTrue(kg_equal(klong('f(!20000;1)'), 2*np.arange(20000)))
+
+    def test_fuse_groupby(self):
+        klong = KlongInterpreter()
+        klong('k::[3 1 3 2 1 3];t::[1.5 2 3 4 5 6];i::[1 2 3 4 5 6];s::"hello foo";e::[]')
+        self.assertTrue(isinstance(klong.prog("{+/t@x}'=k")[1][0].a, KGLambda))
+        self.assertFalse(isinstance(klong.prog("{+/x}'=k")[1][0].a, KGLambda))
+        exprs = ["#'=k", "{#x}'=k", "{#t@x}'=k", "{+/t@x}'=k", "{&/t@x}'=k", "{|/t@x}'=k",
+                 "{(+/t@x)%#x}'=k", "{+/i@x}'=k", "{(+/i@x)%#x}'=k", "#'=s", "{|/i@x}'=s",
+                 "#'=e", "{+/t@x}'=e", "{+/t@x}'=[:a :b :a :c :a :b]", "{+/t@x}'=[[1 2] [3 4]]"]
+        for e in exprs:
+            try:
+                r = klong(e)
+            except Exception:
+                r = 'error'
+            # applying the function to a computed group-by is not fused
+            try:
+                q = klong(e.replace("'=", "'{x}(=") + ")")
+            except Exception:
+                q = 'error'
+            self.assertTrue(kg_equal(r, q), e)
+            self.assertEqual(getattr(r, 'dtype', None), getattr(q, 'dtype', None), e)
+
+    def test_fuse_groupby_float_sums(self):
+        # float sums must match +/ exactly, which sums pairwise
+        rng = np.random.default_rng(1)
+        klong = KlongInterpreter()
+        klong['a'] = rng.integers(0, 2, 100000)
+        klong['t'] = rng.random(100000) * 1e6
+        for e in ["{+/t@x}'=a", "{(+/t@x)%#x}'=a"]:
+            r = klong(e)
+            q = klong(e.replace("'=", "'{x}(=") + ")")
+            self.assertTrue(np.array_equal(r, q), e)
+        klong('f::{{+/t@x}\'=x}')
+        klong['g'] = pickle.loads(pickle.dumps(klong._context[KGSym('f')]))
+        self.assertTrue(np.array_equal(klong('g(a)'), klong("{+/t@x}'=a")))
+
+    def test_fuse_groupby_checks_t(self):
+        # #t@x is only a count when t is an array as long as the grouped list
+        for d in ['t::{,x}', 't::[1 2]', 't:::{[1 2]}', 't::[4 5 6 7 8 9]', 't::"abcdef"']:
+            klong = KlongInterpreter()
+            klong('k::[3 1 3 2 1 3]')
+            klong(d)
+            for e in ["{#t@x}'=k", "{(+/t@x)%#t@x}'=k"]:
+                try:
+                    r = klong(e)
+                except Exception:
+                    r = 'error'
+                try:
+                    q = klong(e.replace("'=", "'{x}(=") + ")")
+                except Exception:
+                    q = 'error'
+                self.assertTrue(kg_equal(r, q), (d, e))
+        klong = KlongInterpreter()
+        klong('k::[3 1 3 2 1 3]')
+        for e in ["{#u@x}'=k", "{+/u@x}'=k"]:
+            klong(e)
+            with self.assertRaises(KeyError):
+                klong['u']
+
+    def test_fuse_enumerate(self):
+        klong = KlongInterpreter()
+        self.assertEqual(klong('+/!1000000000'), 499999999500000000)
+        self.assertEqual(klong('|/!1000000000'), 999999999)
+        self.assertTrue(isinstance(klong.prog('+/!n')[1][0].a, KGLambda))
+        exprs = ['+/!n', '|/!n', '&/!n', '*/!n', '+\\!n', '|\\!n', '&\\!n',
+                 '(!n)@i', '(!n)@j', 'k#!n', 'k_!n']
+        for n in [0, 1, 5]:
+            for i in ['0', '-1', '[0 -1 0]', '[]', '5']:
+                for k in [0, 2, -2, 7, -7]:
+                    klong(f'n::{n};i::{i};j::[1 2];k::{k};a::!n')
+                    for e in exprs:
+                        try:
+                            r = klong(e)
+                        except Exception:
+                            r = 'error'
+                        try:
+                            q = klong(e.replace('!n', 'a'))
+                        except Exception:
+                            q = 'error'
+                        self.assertTrue(kg_equal(r, q), f'{e} n={n} i={i} k={k}')
+        klong('f::{+/!x}')
+        klong['g'] = pickle.loads(pickle.dumps(klong._context[KGSym('f')]))
+        self.assertEqual(klong('g(10)'), 45)
+        self.assertTrue(kg_equal(klong('g(0)'), klong('{+/x}(!0)')))
+
+    def test_fn_arity_projection_body(self):
+        klong = KlongInterpreter()
+        for p,arity in [('{g(;1)}', 1), ('{g(1;)}', 1), ('{g(;;1)}', 1), ('{g(1;2)}', 0), ('{g(x;)}', 2)]:
+            self.assertEqual(klong.prog(p)[1][0].arity, arity, msg=p)
+        klong('g::{x-y};h::{g(;1)}')
+        self.assertEqual(klong('h(5)'), 4)
+        self.assertTrue(kg_equal(klong("h'[1 2]"), [0, 1]))
+        self.assertEqual(klong('{g(1;)}(2)'), -1)
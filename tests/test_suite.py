@@ -1435,6 +1435,15 @@ class TestCoreSuite(unittest.TestCase):
         self.assert_eval_cmp('uniq(!7)', '[0 1 2 3 4 5 6]', klong=klong)
         self.assert_eval_cmp('uniq(!3)', '[0 1 2]', klong=klong)
 
+    def test_dictionaries__literal_copy(self):
+        klong = create_test_klong()
+        klong('g::{:{[1 [1 2]] [2 3]}}')
+        klong('h::g();h,[3 4];2_h')
+        self.assert_eval_cmp('h?3', '4', klong=klong)
+        self.assert_eval_cmp(':_h?2', '1', klong=klong)
+        self.assert_eval_cmp(':_g()?3', '1', klong=klong)
+        self.assert_eval_cmp('g()?2', '3', klong=klong)
+
     def test_real_number_similarity(self):
         klong = create_test_klong()
         klong('s::{(x+2%x)%2}:~2')
@@ -1457,6 +1466,55 @@ class TestCoreSuite(unittest.TestCase):
         klong('a::0 ; t("g()"  ; g()  ; 2)')
         klong('g::0 ; t("f()"  ; f()  ; 2)')
 
+    def test_tail_calls(self):
+        klong = create_test_klong()
+        self.assert_eval_cmp('{:[x<1;y;.f(x-1;y+x)]}(10000;0)', '50005000', klong=klong)
+        klong('ev::{:[x=0;1;od(x-1)]};od::{:[x=0;0;ev(x-1)]}')
+        self.assert_eval_cmp('ev(10001)', '0', klong=klong)
+        klong('g::{[a];a::x;h(x+1)};h::{a+x}')
+        self.assert_eval_cmp('g(7)', '15', klong=klong)
+
+    def test_scalar_arithmetic(self):
+        klong = create_test_klong()
+        klong('a::3;b::4;c::0;d::2.5')
+        self.assert_eval_cmp('a+b', '7', klong=klong)
+        self.assert_eval_cmp('a-d', '0.5', klong=klong)
+        self.assert_eval_cmp('a*d', '7.5', klong=klong)
+        self.assert_eval_cmp('b%a', '1.3333333333333333', klong=klong)
+        self.assert_eval_cmp('(b%c)=b%0', '1', klong=klong)
+        self.assert_eval_cmp('(a<b),(a>b),(a=b),(a=3.0)', '[1 0 0 1]', klong=klong)
+        self.assert_eval_cmp('-d', '-2.5', klong=klong)
+        self.assertTrue(isinstance(klong('a+b'), int))
+
+    def test_cached_lookups(self):
+        klong = create_test_klong()
+        klong('a::1;g::{a+x}')
+        self.assert_eval_cmp('g(1)', '2', klong=klong)
+        self.assert_eval_cmp('{[a];a::10;g(x)}(1)', '11', klong=klong)
+        self.assert_eval_cmp('g(1)', '2', klong=klong)
+        klong('a::5')
+        self.assert_eval_cmp('g(1)', '6', klong=klong)
+        self.assert_eval_cmp('{a::x;g(1)}(7)', '8', klong=klong)
+        self.assert_eval_cmp('g(1)', '8', klong=klong)
+        klong('x::3')
+        self.assert_eval_cmp('x', '3', klong=klong)
+        self.assert_eval_cmp('{x}(4)', '4', klong=klong)
+        del klong['a']
+        self.assert_eval_cmp('a', ':a', klong=klong)
+
+    def test_module_delete(self):
+        klong = create_test_klong()
+        klong('.module(:test)')
+        klong('b::1')
+        klong('.module(0)')
+        self.assert_eval_cmp('b', '1', klong=klong)
+        del klong['b`test']
+        self.assert_eval_cmp('b', ':b', klong=klong)
+        klong('.module(:test)')
+        klong('b::2')
+        klong('.module(0)')
+        self.assert_eval_cmp('b', '2', klong=klong)
+
     def test_forward_reference(self):
         klong = create_test_klong()
         klong('fw::0')
@@ -0,0 +1,63 @@
+import unittest
+
+import test_suite
+from klongpy import KlongInterpreter
+from klongpy.core import KGSym
+from utils import interpreter_suite
+
+
+class TestCompiledCoreSuite(interpreter_suite(test_suite.TestCoreSuite, compiled=True)):
+    """
+    Run the core suite with every interpreter created in compiled mode.
+    """
+
+
+class TestCompiler(unittest.TestCase):
+
+    def test_compiled_mode(self):
+        klong = KlongInterpreter(compiled=True)
+        klong('fib::{:[x<2;x;fib(x-1)+fib(x-2)]}')
+        self.assertEqual(klong('fib(15)'), 610)
+        self.assertEqual(klong('{x<1000}{x*2}:~1'), 1024)
+        self.assertEqual(klong('3{1,x}:*[]').tolist(), [1, 1, 1])
+
+    def test_compiled_locals(self):
+        klong = KlongInterpreter(compiled=True)
+        klong('a::2;fv::{[a];a::1;a}')
+        self.assertEqual(klong('fv()'), 1)
+        self.assertEqual(klong('a'), 2)
+
+    def test_compiled_frame_symbols(self):
+        klong = KlongInterpreter(compiled=True)
+        klong('a::2;g::{a+x}')
+        self.assertEqual(klong('{[a];a::10;g(x)}(1)'), 11)
+        self.assertEqual(klong('{[a b];a::x;b::a*2;:[a<3;b;a+y]}(1;5)'), 2)
+        self.assertEqual(klong('{[a b];a::x;b::a*2;:[a<3;b;a+y]}(4;5)'), 9)
+        self.assertEqual(klong('{y}(1)'), KGSym('y'))
+        self.assertEqual(klong('a'), 2)
+
+    def test_compiled_dot_f(self):
+        klong = KlongInterpreter(compiled=True)
+        self.assertEqual(klong('{:[x<1;0;x+.f(x-1)]}(10)'), 55)
+
+    def test_compiled_closures_are_reused(self):
+        klong = KlongInterpreter(compiled=True)
+        klong('f::{x+1}')
+        p = klong.prog('f(1)')[1][0]
+        self.assertEqual(klong.call(p), 2)
+        c = p._kc_call
+        self.assertEqual(klong.call(p), 2)
+        self.assertIs(p._kc_call, c)
+
+    def test_compiled_closures_per_interpreter(self):
+        klong1 = KlongInterpreter(compiled=True)
+        klong2 = KlongInterpreter(compiled=True)
+        klong1['a'] = 1
+        klong2['a'] = 2
+        p = klong1.prog('a+1')[1][0]
+        self.assertEqual(klong1.call(p), 2)
+        self.assertEqual(klong2.call(p), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
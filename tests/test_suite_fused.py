@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+import test_suite
+from klongpy import KlongInterpreter
+from klongpy.fusion import KGFused, fuse_block_size
+from utils import create_test_klong, interpreter_suite, kg_equal
+
+
+class TestFusedCoreSuite(interpreter_suite(test_suite.TestCoreSuite, fuse_elementwise=True)):
+    """
+    Run the core suite with every interpreter fusing atomic operators.
+    """
+
+    def test_suite_interpreter_fuses(self):
+        klong = create_test_klong()
+        self.assertTrue(isinstance(klong.prog('2*1+a')[1][0], KGFused))
+        self.assertTrue(isinstance(klong.prog('(a<b)|a=3')[1][0], KGFused))
+
+
+class TestFused(unittest.TestCase):
+
+    def test_fused_blocks_match_unfused(self):
+        """
+        Arrays larger than a block, including matrices and truth arrays, give the same
+        values and dtypes as evaluating the operators one by one.
+        """
+        exprs = ['2*1+a', '(a<b)+(a>3)', '(a=b)*b', '((a<b)&(b<3))|a=0', '-(a<b)*2',
+                 '(a%2)+b-1', '(a<b)+(a<b)', 'a+b+1.5']
+        n = fuse_block_size + 3
+        for src in [f'a::!{n};b::(!{n})%7', f'a::2:^!{2*n};b::2:^(!{2*n})%7', f'a::!{n};b::!{n+1}']:
+            klong = KlongInterpreter(fuse_elementwise=True)
+            ref = KlongInterpreter()
+            klong(src)
+            ref(src)
+            for e in exprs:
+                self.assertTrue(isinstance(klong.prog(e)[1][0], KGFused), e)
+                try:
+                    r = klong(e)
+                except Exception:
+                    r = 'error'
+                try:
+                    q = ref(e)
+                except Exception:
+                    q = 'error'
+                self.assertTrue(kg_equal(r, q), (src, e))
+                self.assertEqual(getattr(r, 'dtype', None), getattr(q, 'dtype', None), (src, e))
+                self.assertEqual(np.shape(r), np.shape(q), (src, e))
+
+
+if __name__ == '__main__':
+    unittest.main()
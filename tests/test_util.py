@@ -1,4 +1,6 @@
+import threading
 import unittest
+from unittest.mock import patch
 from klongpy.core import *
 from utils import die, kg_equal
 
@@ -203,6 +205,41 @@ class TestUtil(unittest.TestCase):
         for i,x in enumerate(arr):
             self.assertEqual(cexpect(arr, i, x), i+1)
 
+    def test_lexemes(self):
+        self.assertEqual(read_num("123 4"), (3, 123))
+        self.assertEqual(read_num("-1.5e2;"), (6, -150.0))
+        self.assertEqual(read_sym("a.b.c+1"), (5, KGSym("a.b.c")))
+        self.assertEqual(read_string('say ""hello""!"x'), (15, 'say "hello"!'))
+        self.assertEqual(read_string('abc'), (3, 'abc'))
+        self.assertEqual(skip('  :"a ""b"" c"  x'), 16)
+        self.assertEqual(skip(' \n x'), 1)
+        self.assertEqual(skip(' \n x', ignore_newline=True), 3)
+        self.assertEqual(kg_read(' 0cx'), (4, KGChar('x')))
+        i, q = kg_read('\\~')
+        self.assertEqual((i, q.a), (2, '\\~'))
+
+    def test_read_list_numeric(self):
+        i, a = read_list('1 2 -3]', ']')
+        self.assertEqual(i, 7)
+        self.assertEqual(a.dtype, np.int64)
+        self.assertTrue(kg_equal(a, [1, 2, -3]))
+        i, a = read_list('1 2.5\n1e2 ]', ']')
+        self.assertEqual(a.dtype, np.float64)
+        self.assertTrue(kg_equal(a, [1, 2.5, 100.0]))
+        i, a = read_list('[1 2] [3 4]]', ']')
+        self.assertEqual(a.shape, (2, 2))
+        i, a = read_list('1 2 :foo 3]', ']')
+        self.assertEqual(a.dtype, object)
+        self.assertEqual(a[2], KGSym('foo'))
+        i, a = read_list('1 0cx]', ']')
+        self.assertEqual(a[1], KGChar('x'))
+        i, a = read_list('99999999999999999999 1]', ']')
+        self.assertEqual(a[0], 99999999999999999999)
+        for t in ['1\xa02]', '1\u20032 3]', '1.5\xa02]', '\xa01 2]']:
+            i, a = read_list(t, ']')
+            self.assertEqual(i, len(t), repr(t))
+            self.assertTrue(kg_equal(a, [float(q) for q in t[:-1].split()]), repr(t))
+
     def test_safe_eq(self):
         self.assertFalse(safe_eq(1,[]))
         self.assertTrue(safe_eq(1,1))
@@ -228,6 +265,108 @@ class TestUtil(unittest.TestCase):
         a = [[1],[2],[],[3]]
         self.assertTrue(kg_equal(kg_argsort(a,descending=True), [3, 1, 0, 2]))
 
+    def test_code_arr(self):
+        for s in ["", "abc", "héllo wörld", "😀\x00z"]:
+            a = str_to_code_arr(s)
+            self.assertEqual(a.dtype, np.uint32)
+            self.assertEqual(len(a), len(s))
+            self.assertEqual(code_arr_to_str(a), s)
+        self.assertEqual(code_arr_to_str(str_to_code_arr("abcd")[::-1]), "dcba")
+        self.assertTrue(kg_equal(code_arr_to_str(str_to_code_arr("abcdef").reshape(2,3)), ["abc", "def"]))
+        self.assertEqual(code_arr_to_str(str_to_code_arr("abcdef").reshape(2,3)).dtype, object)
+        self.assertEqual(code_arr_to_str(str_to_code_arr("abcdefgh").reshape(2,2,2)).shape, (2,2))
+
+
+    def test_sym_codes(self):
+        a = np.asarray([KGSym('b'), KGSym('a'), KGSym('b')], dtype=object)
+        c = sym_codes(a)
+        self.assertEqual(c.dtype, np.int32)
+        self.assertEqual(c[0], c[2])
+        self.assertNotEqual(c[0], c[1])
+        self.assertEqual(c[1], intern_sym(KGSym('a')))
+        self.assertTrue(kg_equal(sym_ranks(a), [1, 0, 1]))
+        self.assertIsNone(sym_codes(np.asarray([KGSym('a'), 'a'], dtype=object)))
+        self.assertIsNone(sym_codes(np.asarray([KGSym('a'), 1], dtype=object)))
+        self.assertIsNone(sym_codes(np.asarray([1, 2])))
+
+    def test_sym_table_threads(self):
+        t = SymbolTable()
+        names = [f"s{i}" for i in range(1000)]
+        def run():
+            for x in names:
+                t.intern(x)
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for q in threads:
+            q.start()
+        for q in threads:
+            q.join()
+        self.assertEqual(len(t.names), len(names))
+        self.assertEqual(sorted(t.codes.values()), list(range(len(names))))
+        self.assertEqual([t.names[t.codes[x]] for x in names], names)
+
+    def test_sym_table_bounded(self):
+        with patch('klongpy.core.max_sym_table_size', 2):
+            t = sym_table()
+            intern_sym(KGSym('a'), t)
+            intern_sym(KGSym('b'), t)
+            intern_sym(KGSym('c'), t)
+            u = sym_table()
+            self.assertIsNot(u, t)
+            self.assertEqual(len(u.names), 0)
+            self.assertIs(sym_table(), u)
+            a = np.asarray([KGSym('c'), KGSym('a'), KGSym('c')], dtype=object)
+            self.assertTrue(kg_equal(sym_ranks(a), [1, 0, 1]))
+
+
+    def test_ragged(self):
+        a = np.asarray([np.asarray([1, 2]), np.asarray([3]), np.asarray([], dtype=int)], dtype=object)
+        v, o = ragged(a)
+        self.assertTrue(kg_equal(v, [1, 2, 3]))
+        self.assertTrue(kg_equal(o, [0, 2, 3, 3]))
+        self.assertTrue(kg_equal(unragged(v, o), a))
+        self.assertIsNone(ragged(np.asarray([np.asarray([1, 2]), np.asarray([3.0])], dtype=object)))
+        self.assertIsNone(ragged(np.asarray([np.asarray([1, 2]), 3], dtype=object)))
+        self.assertIsNone(ragged(np.asarray([[1, 2], [3, 4]])))
+        self.assertTrue(kg_equal(ragged_fn(a, np.negative), [[-1, -2], [-3], []]))
+        self.assertTrue(kg_equal(ragged_fn2(a, np.asarray([10, 20, 30]), np.add), [[11, 12], [23], []]))
+        self.assertTrue(kg_equal(ragged_fn2(1, a, np.subtract), [[0, -1], [-2], []]))
+        self.assertIsNone(ragged_fn2(a, np.asarray([1, 2]), np.add))
+
+
+    def test_kg_asarray_single_pass(self):
+        a = np.asarray([1, 2])
+        b = np.asarray([3])
+        with patch('klongpy.core._kg_asarray_trial', side_effect=AssertionError):
+            self.assertEqual(kg_asarray([1, 2.5]).dtype, np.float64)
+            self.assertEqual(kg_asarray([[1, 2], [3, 4]]).shape, (2, 2))
+            self.assertEqual(kg_asarray([a, a]).shape, (2, 2))
+            r = kg_asarray([a, b])
+            self.assertEqual(r.dtype, object)
+            self.assertTrue(kg_equal(r, [[1, 2], [3]]))
+            r = kg_asarray([KGSym('a'), "b", 1])
+            self.assertEqual(r.dtype, object)
+            self.assertEqual(r.shape, (3,))
+            r = kg_asarray([[1, 2], [3], 4])
+            self.assertEqual(r.dtype, object)
+            self.assertTrue(kg_equal(r, [[1, 2], [3], 4]))
+            self.assertTrue(kg_equal(kg_asarray([a, b], homogeneous=True), [[1, 2], [3]]))
+            self.assertEqual(kg_asarray([a, a], homogeneous=True).shape, (2, 2))
+        self.assertTrue(kg_equal(kg_asarray([[1, [2]], [3, [4]]]), [[1, [2]], [3, [4]]]))
+
+
+    def test_truth(self):
+        b = np.asarray([True, False, True])
+        t = kg_truth(b)
+        self.assertEqual(t.dtype, np.uint8)
+        self.assertTrue(np.shares_memory(t, b))
+        self.assertTrue(kg_equal(t, [1, 0, 1]))
+        self.assertEqual(kg_truth(np.bool_(True)), 1)
+        self.assertEqual(kg_truth(False), 0)
+        self.assertEqual(truth_to_int(t).dtype, int)
+        self.assertEqual(type(truth_to_int(t[0])), int)
+        self.assertEqual(truth_to_int(np.asarray([1.5])).dtype, np.float64)
+
+
 
 if __name__ == '__main__':
   unittest.main()
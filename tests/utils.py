@@ -1,6 +1,9 @@
 import asyncio
+import functools
+import sys
 import threading
 import time
+from unittest.mock import patch
 
 import numpy as np
 
@@ -60,6 +63,25 @@ def create_test_klong():
     return klong
 
 
+def interpreter_suite(suite, **kwargs):
+    """
+    Return a subclass of the test case suite in which every KlongInterpreter created by
+    the suite's module, or by create_test_klong, is created with the arguments kwargs.
+    """
+    klong = functools.partial(KlongInterpreter, **kwargs)
+    modules = [sys.modules[suite.__module__], sys.modules[__name__]]
+
+    class InterpreterSuite(suite):
+        def setUp(self):
+            super().setUp()
+            for m in modules:
+                p = patch.object(m, 'KlongInterpreter', klong)
+                p.start()
+                self.addCleanup(p.stop)
+
+    return InterpreterSuite
+
+
 def run_file(x, klong=None):
     with open(x, "r") as f:
         klong = klong or KlongInterpreter()